@@ -2,22 +2,111 @@ import base64
 import os
 from datetime import datetime
 
-import requests
 import streamlit as st
-from bs4 import BeautifulSoup
-from groq import Groq
 
+from newsbot import news
+from newsbot.answers import answer_cache_key, get_answer_cache
+from newsbot.articles import (
+    PrefetchJob,
+    extract_article_content,
+    extract_articles_bulk,
+    get_prefetcher,
+    parse_url_list,
+)
+from newsbot.config import get_setting, use_secrets
+from newsbot.conversation import build_history, chat_turns, new_chat_summary, update_chat_summary
+from newsbot.headlines import (
+    TOP_HEADLINES,
+    get_headline_scheduler,
+    get_headline_store,
+    query_feed,
+    stored_headlines,
+)
+from newsbot.llm import (
+    GROQ_MODEL,
+    GROQ_TEMPERATURE,
+    build_digest_context,
+    format_answer_metrics,
+    stream_groq,
+    summarize_articles,
+)
+from newsbot.metrics import metrics as stage_metrics, start_metrics_server
+from newsbot.news import GENRES
+from newsbot.outbound import OutboundQueueTimeout
+from newsbot.retrieval import ArticleIndex, build_retrieval_context
+from newsbot.routing import answer_routed
+from newsbot.similarity import dedupe_headlines, drop_near_duplicates, find_near_duplicate
+from newsbot.workspace import (
+    SessionArticles,
+    export_snapshot,
+    load_snapshot,
+    new_session_articles,
+    restore_snapshot,
+)
 
-# --- Function to add background image ---
-def add_bg_from_local(image_file):
-    """Add background image to Streamlit app from a local file"""
-    with open(image_file, "rb") as img:
+# Settings in secrets.toml apply to the newsbot core as well
+use_secrets(st.secrets)
+
+# Optional Prometheus endpoint, started once per process
+if get_setting("metrics", "port", 0):
+    start_metrics_server(get_setting("metrics", "port", 0), get_setting("metrics", "host", "127.0.0.1"))
+
+
+# --- Background asset pipeline ---
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+BACKGROUND_MAX_WIDTH = 1920
+
+def build_background_variants(image_file, max_width=BACKGROUND_MAX_WIDTH):
+    """Write downscaled WebP and progressive JPEG copies of the background to static/"""
+    try:
+        from PIL import Image
+    except ImportError:
+        return {}
+
+    os.makedirs(STATIC_DIR, exist_ok=True)
+    stem = os.path.splitext(os.path.basename(image_file))[0]
+    variants = {
+        "webp": os.path.join(STATIC_DIR, f"{stem}_bg.webp"),
+        "jpeg": os.path.join(STATIC_DIR, f"{stem}_bg.jpg"),
+    }
+    source_mtime = os.path.getmtime(image_file)
+    if all(os.path.exists(p) and os.path.getmtime(p) >= source_mtime for p in variants.values()):
+        return variants
+
+    with Image.open(image_file) as img:
+        img = img.convert("RGB")
+        if img.width > max_width:
+            img = img.resize((max_width, round(img.height * max_width / img.width)), Image.LANCZOS)
+        img.save(variants["webp"], "WEBP", quality=75, method=6)
+        img.save(variants["jpeg"], "JPEG", quality=75, optimize=True, progressive=True)
+    return variants
+
+def background_image_css(image_file):
+    """Return the CSS background-image declarations for the background asset"""
+    variants = build_background_variants(image_file)
+    if variants and st.get_option("server.enableStaticServing"):
+        webp_url = f"app/static/{os.path.basename(variants['webp'])}"
+        jpeg_url = f"app/static/{os.path.basename(variants['jpeg'])}"
+        return (
+            f'background-image: url("{jpeg_url}");\n'
+            f'        background-image: image-set(url("{webp_url}") type("image/webp"), '
+            f'url("{jpeg_url}") type("image/jpeg"));'
+        )
+
+    # Static serving is off: inline the smallest file we have
+    inline_file = variants.get("webp", image_file)
+    mime = "image/webp" if inline_file.endswith(".webp") else "image/jpeg"
+    with open(inline_file, "rb") as img:
         encoded_img = base64.b64encode(img.read()).decode()
+    return f'background-image: url("data:{mime};base64,{encoded_img}");'
 
+@st.cache_resource
+def build_page_style(image_file):
+    """Build the page stylesheet once per process"""
     page_bg_img = f"""
     <style>
     [data-testid="stAppViewContainer"] {{
-        background-image: url("data:image1/jpg;base64,{encoded_img}");
+        {background_image_css(image_file)}
         background-size: cover;
         background-position: center;
         background-attachment: fixed;
@@ -183,7 +272,12 @@ def add_bg_from_local(image_file):
     }}
     </style>
     """
-    st.markdown(page_bg_img, unsafe_allow_html=True)
+    return page_bg_img
+
+# --- Function to add background image ---
+def add_bg_from_local(image_file):
+    """Add background image to Streamlit app from a local file"""
+    st.markdown(build_page_style(image_file), unsafe_allow_html=True)
 
 
 # Page config with sidebar initially collapsed
@@ -200,53 +294,49 @@ add_bg_from_local("image1.jpg")
 # Initialize session state
 if 'messages' not in st.session_state:
     st.session_state.messages = []
-if 'article_content' not in st.session_state:
-    st.session_state.article_content = {}
+if 'chat_summary' not in st.session_state:
+    st.session_state.chat_summary = new_chat_summary()
+# Loaded articles are references into the process-wide shared texts
+if not isinstance(st.session_state.get('article_content'), SessionArticles):
+    st.session_state.article_content = new_session_articles(st.session_state.get('article_content'))
 if 'page' not in st.session_state:
     st.session_state.page = "home"
 if 'selected_genre' not in st.session_state:
     st.session_state.selected_genre = None
-if 'expanded_article' not in st.session_state:
-    st.session_state.expanded_article = None
+if 'expanded_articles' not in st.session_state:
+    st.session_state.expanded_articles = set()
+if 'list_page' not in st.session_state:
+    st.session_state.list_page = {}
 if 'user_location' not in st.session_state:
     st.session_state.user_location = None
 if 'genre_page_keyword' not in st.session_state:
     st.session_state.genre_page_keyword = None
 
-# News genres and keywords
-GENRES = {
-    "🤖 AI & Tech": "artificial intelligence technology",
-    "💼 Business": "business economy finance",
-    "📈 Stocks & Finance": "stocks finance cryptocurrency markets trading",
-    "🏥 Health": "health medical science",
-    "🌍 World": "world international news",
-    "⚽ Sports": "sports athletics games",
-    "🎬 Entertainment": "entertainment movies celebrity",
-    "🔬 Science": "science research discovery",
-    "🚀 Innovation": "innovation startup technology",
-    "🏛️ Politics": "politics government election policy"
-}
+# --- NewsAPI ---
+def stored_feed(feed, limit):
+    """Headlines from the local store while the scheduler keeps feed fresh, else None"""
+    if not get_setting("scheduler", "enabled", False):
+        return None
+    return stored_headlines(feed, limit, max_age=2 * get_setting("scheduler", "interval", 3600))
+
+def rate_limited_feed(feed, limit):
+    """Whatever the local store has for feed, however old, while NewsAPI's rate limit is spent"""
+    stored = stored_headlines(feed, limit, max_age=float("inf")) or []
+    st.warning(
+        "NewsAPI's request limit is used up for now"
+        + (", so these headlines may be out of date." if stored else "; try again later.")
+    )
+    return stored
 
 def fetch_news_by_genre(genre_keyword, api_key, page_size=10):
     """Fetch news articles using NewsAPI based on genre keyword"""
     try:
-        url = "https://newsapi.org/v2/everything"
-        params = {
-            "q": genre_keyword,
-            "sortBy": "publishedAt",
-            "language": "en",
-            "pageSize": page_size,
-            "apiKey": api_key
-        }
-        
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        
-        if data.get("status") == "ok":
-            return data.get("articles", [])
-        else:
-            return []
+        stored = stored_feed(query_feed(genre_keyword), page_size)
+        if stored:
+            return stored
+        return news.fetch_news_by_genre(genre_keyword, api_key, page_size=page_size)
+    except OutboundQueueTimeout:
+        return rate_limited_feed(query_feed(genre_keyword), page_size)
     except Exception as e:
         st.error(f"Error fetching news: {str(e)}")
         return []
@@ -254,86 +344,69 @@ def fetch_news_by_genre(genre_keyword, api_key, page_size=10):
 def fetch_top_headlines(api_key, page_size=30):
     """Fetch top headlines from across the world"""
     try:
-        url = "https://newsapi.org/v2/top-headlines"
-        params = {
-            "language": "en",
-            "pageSize": page_size,
-            "apiKey": api_key
-        }
-        
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        
-        if data.get("status") == "ok":
-            return data.get("articles", [])
-        else:
-            return []
+        stored = stored_feed(TOP_HEADLINES, page_size)
+        if stored:
+            return stored
+        return news.fetch_top_headlines(api_key, page_size=page_size)
+    except OutboundQueueTimeout:
+        return rate_limited_feed(TOP_HEADLINES, page_size)
     except Exception as e:
         st.error(f"Error fetching headlines: {str(e)}")
         return []
 
-def extract_article_content(url):
-    """Extract text content from a news article URL"""
-    try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        for script in soup(["script", "style", "nav", "footer", "header"]):
-            script.decompose()
-        
-        text = soup.get_text()
-        lines = (line.strip() for line in text.splitlines())
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        text = ' '.join(chunk for chunk in chunks if chunk)
-        
-        return text[:15000]
-    except Exception as e:
-        return f"Error extracting content: {str(e)}"
-
-def query_groq(question, context, api_key):
-    """Query Groq API with article context"""
-    try:
-        client = Groq(api_key=api_key)
-        
-        prompt = f"""You are NEWSBOT, a helpful news research assistant. Based on the following article content, answer the user's question accurately and concisely.
+# --- Speculative headline prefetch ---
+def prefetch_headlines(articles):
+    """Start extracting the top headlines in the background, replacing this session's previous prefetch"""
+    if not get_setting("prefetch", "enabled", False):
+        return
+    urls = [a.get("url") for a in articles[:get_setting("prefetch", "top_n", 5)] if a.get("url")]
+    job = st.session_state.get("prefetch_job")
+    if job is not None and job.urls == tuple(urls):
+        return
+    if job is not None:
+        job.cancelled.set()
+    job = PrefetchJob(urls, byte_budget=get_setting("prefetch", "byte_budget", 8 * 1024 * 1024))
+    st.session_state.prefetch_job = job
+    get_prefetcher().submit(job)
 
-Article Content:
-{context}
+def add_article(url, content):
+    """Add extracted text to the workspace unless it repeats an article already loaded.
 
-User Question: {question}
+    Returns the URL of the near-duplicate already loaded, if any. With
+    ``[dedupe] skip_articles`` turned off the article is added anyway.
+    """
+    # Texts evicted from memory and disk can't be compared against (or read at all)
+    expired = st.session_state.article_content.drop_missing()
+    if expired:
+        st.warning(f"⚠️ {len(expired)} article(s) expired from the shared cache; load them again to keep asking about them.")
+    others = {u: t for u, t in st.session_state.article_content.items() if u != url}
+    duplicate_of = find_near_duplicate(content, others, get_setting("dedupe", "article_threshold", 0.8))
+    if duplicate_of is None or not get_setting("dedupe", "skip_articles", True):
+        st.session_state.article_content[url] = content
+    return duplicate_of
 
-Provide a clear, informative answer based solely on the article content. If the information isn't in the article, say so."""
+def workspace_is_full():
+    """Warn and return True when this session can't load another article"""
+    if not st.session_state.article_content.is_full():
+        return False
+    st.warning(
+        f"⚠️ Up to {st.session_state.article_content.max_articles} articles can be loaded at once; "
+        "remove one to load another."
+    )
+    return True
 
-        chat_completion = client.chat.completions.create(
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are NEWSBOT, a helpful and accurate news research assistant."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            model="llama-3.3-70b-versatile",
-            temperature=0.3,
-            max_tokens=1024,
-        )
-        
-        return chat_completion.choices[0].message.content
-    except Exception as e:
-        return f"Error querying Groq: {str(e)}"
+def toggle_expanded(article_key):
+    """Expand or collapse one article card"""
+    if article_key in st.session_state.expanded_articles:
+        st.session_state.expanded_articles.discard(article_key)
+    else:
+        st.session_state.expanded_articles.add(article_key)
 
+@st.fragment
 def display_article(article, idx, is_home_page=True):
-    """Display a single article"""
-    article_key = f"article_{idx}"
-    is_expanded = st.session_state.expanded_article == article_key
+    """Display a single article; its buttons rerun only this card"""
+    article_key = article.get('url') or f"article_{idx}"
+    is_expanded = article_key in st.session_state.expanded_articles
     
     col1, col2, col3 = st.columns([2.5, 0.5, 0.5])
     
@@ -352,6 +425,11 @@ def display_article(article, idx, is_home_page=True):
         if pub_date:
             st.caption(f"📅 {pub_date[:10]}")
         
+        duplicates = article.get('duplicates')
+        if duplicates:
+            outlets = ", ".join(d.get('source', {}).get('name') or 'Unknown' for d in duplicates)
+            st.caption(f"🔁 Also reported by: {outlets}")
+        
         # Show additional info when expanded
         if is_expanded:
             st.markdown("---")
@@ -369,27 +447,77 @@ def display_article(article, idx, is_home_page=True):
     with col2:
         if st.button("📖 Load", key=f"load_{idx}", use_container_width=True):
             article_url = article.get('url', '')
-            if article_url:
+            if article_url and not workspace_is_full():
                 with st.spinner("Extracting article content..."):
+                    get_prefetcher().wait_for(article_url, timeout=10)
                     content = extract_article_content(article_url)
-                    if not content.startswith("Error"):
-                        st.session_state.article_content[article_url] = content
-                        st.session_state.page = "research"
-                        st.success("✅ Article loaded! Go to Research tab.")
-                        st.rerun()
-                    else:
+                    if content.startswith("Error"):
                         st.error(content)
+                    else:
+                        add_article(article_url, content)
+                        if article_url not in st.session_state.article_content:
+                            st.warning("⚠️ A near-identical article is already loaded; skipped.")
+                        else:
+                            st.session_state.page = "research"
+                            st.success("✅ Article loaded! Go to Research tab.")
+                            st.rerun()
     
     with col3:
-        if st.button("📖 Read More" if not is_expanded else "📕 Read Less", key=f"expand_{idx}", use_container_width=True):
-            if is_expanded:
-                st.session_state.expanded_article = None
-            else:
-                st.session_state.expanded_article = article_key
-            st.rerun()
+        st.button(
+            "📖 Read More" if not is_expanded else "📕 Read Less",
+            key=f"expand_{idx}",
+            use_container_width=True,
+            on_click=toggle_expanded,
+            args=(article_key,),
+        )
     
     st.markdown("---")
 
+def set_list_page(list_name, page):
+    """Move a paginated article list to another page"""
+    st.session_state.list_page[list_name] = page
+
+@st.fragment
+def display_article_list(articles, list_name, is_home_page=True):
+    """Display one page of articles; paging reruns only the list"""
+    per_page = get_setting("display", "articles_per_page", 10)
+    page_count = max(1, -(-len(articles) // per_page))
+    page = min(st.session_state.list_page.get(list_name, 0), page_count - 1)
+    
+    start = page * per_page
+    for idx, article in enumerate(articles[start:start + per_page], start):
+        display_article(article, idx, is_home_page=is_home_page)
+    prefetch_headlines(articles[start:start + per_page])
+    
+    if page_count > 1:
+        col1, col2, col3 = st.columns([1, 2, 1])
+        with col1:
+            st.button(
+                "◀ Previous",
+                key=f"prev_{list_name}",
+                disabled=page == 0,
+                use_container_width=True,
+                on_click=set_list_page,
+                args=(list_name, page - 1),
+            )
+        with col2:
+            st.caption(f"Page {page + 1} of {page_count}")
+        with col3:
+            st.button(
+                "Next ▶",
+                key=f"next_{list_name}",
+                disabled=page == page_count - 1,
+                use_container_width=True,
+                on_click=set_list_page,
+                args=(list_name, page + 1),
+            )
+
+# Per-session retrieval index over loaded articles
+if 'article_index' not in st.session_state:
+    st.session_state.article_index = ArticleIndex(
+        chunk_chars=get_setting("retrieval", "chunk_chars", 1200)
+    )
+
 # Get API keys from secrets
 try:
     groq_api_key = st.secrets["groq"]["api_key"]
@@ -398,6 +526,53 @@ except Exception as e:
     st.error("⚠️ API keys not found in secrets.toml")
     st.stop()
 
+# Background polling of NewsAPI into the local headline store, once per process
+headline_scheduler = None
+if news_api_key and get_setting("scheduler", "enabled", False):
+    headline_scheduler = get_headline_scheduler(news_api_key)
+    if st.session_state.user_location:
+        # Asked again on every rerun, so it stays polled while a session is using it
+        headline_scheduler.add_query(st.session_state.user_location)
+
+def show_metrics_panel():
+    """Admin view of the process-wide stage timings, sizes, cache and error counts"""
+    stages = stage_metrics.stage_summary()
+    if stages:
+        st.dataframe(
+            [
+                {
+                    "stage": stage,
+                    "calls": s["count"],
+                    "mean ms": round(s["mean_s"] * 1000, 1),
+                    "p50 ≤ ms": s["p50_s"] * 1000,
+                    "p95 ≤ ms": s["p95_s"] * 1000,
+                }
+                for stage, s in stages.items()
+            ],
+            hide_index=True,
+            use_container_width=True,
+        )
+    else:
+        st.caption("No stages timed yet.")
+
+    totals = {}
+    for (name, labels), value in {**stage_metrics.counters(), **stage_metrics.gauges()}.items():
+        label = ", ".join(f"{k}={v}" for k, v in labels)
+        name = name.removeprefix("newsbot_")
+        totals[f"{name}{{{label}}}" if label else name] = value
+    st.dataframe(
+        [{"counter": name, "value": value} for name, value in sorted(totals.items())],
+        hide_index=True,
+        use_container_width=True,
+    )
+    st.download_button(
+        "⬇️ Prometheus metrics",
+        stage_metrics.render(),
+        file_name="newsbot_metrics.txt",
+        mime="text/plain",
+        use_container_width=True,
+    )
+
 # Sidebar navigation
 with st.sidebar:
     st.markdown("<h3 style='color: white;'>🗂️ Navigation</h3>", unsafe_allow_html=True)
@@ -408,6 +583,7 @@ with st.sidebar:
     if st.button("🏠 Home", use_container_width=True, key="btn_home"):
         st.session_state.page = "home"
         st.session_state.messages = []
+        st.session_state.chat_summary = new_chat_summary()
         st.session_state.selected_genre = None
         st.rerun()
     
@@ -447,8 +623,15 @@ with st.sidebar:
     
     if location_input and location_input != st.session_state.user_location:
         st.session_state.user_location = location_input
+        if headline_scheduler is not None:
+            headline_scheduler.add_query(location_input)
         st.success(f"✅ Location updated to {location_input}")
 
+    if get_setting("metrics", "admin_panel", False):
+        st.markdown("---")
+        with st.expander("📊 Metrics"):
+            show_metrics_panel()
+
 # HOME PAGE - Top 30 Trending News
 if st.session_state.page == "home":
     st.markdown("<h1 style='color: black;'>🤖 NEWSBOT</h1>", unsafe_allow_html=True)
@@ -458,15 +641,31 @@ if st.session_state.page == "home":
         st.warning("⚠️ NewsAPI key not configured. Please add it to secrets.toml to view trending news.")
         st.info("Get a free API key from https://newsapi.org")
     else:
-        with st.spinner("Fetching top 30 trending news worldwide..."):
-            articles = fetch_top_headlines(news_api_key, page_size=30)
+        search_text = ""
+        if headline_scheduler is not None:
+            search_text = st.text_input(
+                "🔎 Search recent headlines",
+                placeholder="e.g. central bank, election",
+                key="headline_search",
+            ).strip()
         
-        if articles:
-            st.markdown("---")
-            for idx, article in enumerate(articles):
-                display_article(article, idx, is_home_page=True)
+        if search_text:
+            # Full-text search over everything the scheduler has stored
+            articles = dedupe_headlines(get_headline_store().search(search_text, limit=30))
+            if articles:
+                st.markdown("---")
+                display_article_list(articles, f"search:{search_text}", is_home_page=True)
+            else:
+                st.info(f"No stored headlines match \"{search_text}\".")
         else:
-            st.info("No trending articles found.")
+            with st.spinner("Fetching top 30 trending news worldwide..."):
+                articles = fetch_top_headlines(news_api_key, page_size=30)
+            
+            if articles:
+                st.markdown("---")
+                display_article_list(articles, "home", is_home_page=True)
+            else:
+                st.info("No trending articles found.")
 
 # GENRE PAGE - Top 15 News for Selected Genre
 elif st.session_state.page == "genre_page":
@@ -487,8 +686,7 @@ elif st.session_state.page == "genre_page":
         
         if articles:
             st.markdown("---")
-            for idx, article in enumerate(articles):
-                display_article(article, idx, is_home_page=False)
+            display_article_list(articles, f"genre:{search_keyword}", is_home_page=False)
         else:
             st.info(f"No articles found for {st.session_state.selected_genre}")
 
@@ -497,6 +695,10 @@ elif st.session_state.page == "research":
     st.markdown("<h1 style='color: black;'>🤖 NEWSBOT</h1>", unsafe_allow_html=True)
     st.markdown("<h6 style='color: black;'>Your News Research Assistant</h6>", unsafe_allow_html=True)
     
+    expired = st.session_state.article_content.drop_missing()
+    if expired:
+        st.warning(f"⚠️ {len(expired)} article(s) expired from the shared cache; load them again to keep asking about them.")
+    
     # Sidebar for settings
     with st.sidebar:
         st.markdown("<h3 style='color: white;'>📰 Load Articles</h3>", unsafe_allow_html=True)
@@ -504,34 +706,152 @@ elif st.session_state.page == "research":
         url_input = st.text_input("", placeholder="https://example.com/article", key="url_input")
         
         if st.button("Load Article", use_container_width=True, key="btn_load_article"):
-            if url_input:
+            if url_input and not workspace_is_full():
                 with st.spinner("Extracting article content..."):
                     content = extract_article_content(url_input)
-                    if not content.startswith("Error"):
-                        st.session_state.article_content[url_input] = content
-                        st.success("✅ Article loaded!")
-                    else:
+                    if content.startswith("Error"):
                         st.error(content)
-            else:
+                    else:
+                        duplicate_of = add_article(url_input, content)
+                        if url_input not in st.session_state.article_content:
+                            st.warning(f"⚠️ Near-identical to {duplicate_of[:40]}..., already loaded; skipped.")
+                        elif duplicate_of:
+                            st.warning(f"⚠️ Loaded, but near-identical to {duplicate_of[:40]}...")
+                        else:
+                            st.success("✅ Article loaded!")
+            elif not url_input:
                 st.warning("Please enter a URL 📎")
         
+        # Bulk loading
+        with st.expander("📑 Bulk Load"):
+            bulk_text = st.text_area(
+                "URLs, one per line",
+                placeholder="https://example.com/article-1\nhttps://example.com/article-2",
+                key="bulk_urls",
+            )
+            bulk_file = st.file_uploader("Or upload a .txt list", type=["txt"], key="bulk_file")
+
+            if st.button("Load All", use_container_width=True, key="btn_load_bulk"):
+                source_text = bulk_text
+                if bulk_file is not None:
+                    source_text += "\n" + bulk_file.getvalue().decode("utf-8", errors="ignore")
+                urls = parse_url_list(source_text)
+
+                if urls and not workspace_is_full():
+                    room = st.session_state.article_content.remaining()
+                    if room is not None and len(urls) > room:
+                        st.warning(f"⚠️ Only {room} more article(s) fit in this session; loading the first {room}.")
+                        urls = urls[:room]
+                    progress = st.progress(0.0, text=f"Loading {len(urls)} articles...")
+
+                    def report(url, text, done, total):
+                        status = "❌" if text.startswith("Error") else "✅"
+                        progress.progress(done / total, text=f"{status} {done}/{total} {url[:40]}")
+
+                    results = extract_articles_bulk(urls, on_result=report)
+                    loaded = {url: text for url, text in results.items() if not text.startswith("Error")}
+                    skipped = {}
+                    for url, text in loaded.items():
+                        duplicate_of = add_article(url, text)
+                        if url not in st.session_state.article_content:
+                            skipped[url] = duplicate_of
+
+                    if len(loaded) > len(skipped):
+                        st.success(f"✅ Loaded {len(loaded) - len(skipped)} of {len(urls)} articles!")
+                    for url, duplicate_of in skipped.items():
+                        st.warning(f"{url[:40]}: near-identical to {duplicate_of[:40]}..., skipped")
+                    for url, text in results.items():
+                        if url not in loaded:
+                            st.error(f"{url[:40]}: {text}")
+                elif not urls:
+                    st.warning("Please enter at least one URL 📎")
+        
+        # Save and restore the whole workspace
+        with st.expander("💾 Save / Restore Workspace"):
+            if st.session_state.article_content or st.session_state.messages:
+                include_text = st.checkbox(
+                    "Include article text",
+                    value=True,
+                    key="snapshot_include_text",
+                    help="Without it the snapshot is tiny, but articles this server no longer has are fetched again",
+                )
+                if st.button("📦 Create Snapshot", use_container_width=True, key="btn_snapshot"):
+                    # Built on demand and not kept in session state, so it costs no memory between reruns
+                    snapshot = export_snapshot(
+                        st.session_state.article_content,
+                        st.session_state.messages,
+                        include_text=include_text,
+                        chat_summary=st.session_state.chat_summary,
+                    )
+                    st.download_button(
+                        f"⬇️ Download ({len(snapshot) / 1024:.0f} KiB)",
+                        snapshot,
+                        file_name=f"newsbot-workspace-{datetime.now():%Y%m%d-%H%M%S}.nbws",
+                        mime="application/octet-stream",
+                        on_click="ignore",
+                        use_container_width=True,
+                    )
+            snapshot_file = st.file_uploader("Restore a snapshot", type=["nbws"], key="snapshot_file")
+            if snapshot_file is not None and st.button("♻️ Restore", use_container_width=True, key="btn_restore"):
+                try:
+                    snapshot = load_snapshot(snapshot_file.getvalue())
+                except ValueError as e:
+                    st.error(f"❌ {e}")
+                else:
+                    missing = restore_snapshot(st.session_state.article_content, snapshot)
+                    st.session_state.messages = snapshot["messages"]
+                    # Older snapshots carry no summary; it is rebuilt a batch per answer
+                    st.session_state.chat_summary = {**new_chat_summary(), **snapshot.get("chat_summary", {})}
+                    if missing:
+                        room = st.session_state.article_content.remaining()
+                        with st.spinner(f"Fetching {len(missing)} article(s) not in the snapshot..."):
+                            fetched = extract_articles_bulk(missing if room is None else missing[:room])
+                        for url, text in fetched.items():
+                            if not text.startswith("Error"):
+                                st.session_state.article_content[url] = text
+                    left_out = len(snapshot["articles"]) - len(st.session_state.article_content)
+                    if left_out:
+                        st.warning(f"⚠️ {left_out} article(s) from the snapshot couldn't be restored.")
+                    else:
+                        st.success("✅ Workspace restored!")
+
         # Display loaded articles
         if st.session_state.article_content:
             st.markdown("------")
             st.markdown("<h3 style='color: black;'>📚 Loaded Articles</h3>", unsafe_allow_html=True)
-            for i, url in enumerate(st.session_state.article_content.keys(), 1):
+            duplicates = drop_near_duplicates(
+                st.session_state.article_content, get_setting("dedupe", "article_threshold", 0.8)
+            )[1]
+            loaded_urls = list(st.session_state.article_content)
+            for i, url in enumerate(loaded_urls, 1):
                 col1, col2 = st.columns([3, 1])
                 with col1:
                     st.caption(f"{i}. {url[:30]}...")
+                    if url in duplicates:
+                        st.caption(f"⚠️ near-duplicate of {loaded_urls.index(duplicates[url]) + 1}")
                 with col2:
                     if st.button("🗑️", key=f"del_{i}", use_container_width=True):
                         del st.session_state.article_content[url]
                         st.rerun()
             
+            st.toggle(
+                "🧾 Digest mode",
+                key="digest_mode",
+                help="Summarize each article in parallel and answer from the summaries",
+            )
+            answer_cache = get_answer_cache()
+            lookups = answer_cache.stats["hits"] + answer_cache.stats["misses"]
+            if lookups:
+                st.caption(
+                    f"💾 Answer cache hit rate: {answer_cache.hit_rate():.0%} "
+                    f"({answer_cache.stats['hits']}/{lookups})"
+                )
+            
             st.markdown("---")
             if st.button("Clear All", use_container_width=True, key="btn_clear_all"):
-                st.session_state.article_content = {}
+                st.session_state.article_content.clear()
                 st.session_state.messages = []
+                st.session_state.chat_summary = new_chat_summary()
                 st.rerun()
     
     # Main chat interface
@@ -541,27 +861,117 @@ elif st.session_state.page == "research":
     for message in st.session_state.messages:
         with st.chat_message(message["role"]):
             st.markdown(message["content"])
+            if message.get("metrics") and format_answer_metrics(message["metrics"]):
+                st.caption(format_answer_metrics(message["metrics"]))
     
     # Chat input
-    if prompt := st.chat_input("💬 Ask a question about your loaded articles..."):
+    prompt = st.chat_input("💬 Ask a question about your loaded articles...")
+    regenerate = False
+    force_deep = False
+    if not prompt and st.session_state.get("regenerate_question"):
+        prompt = st.session_state.pop("regenerate_question")
+        regenerate = True
+        force_deep = st.session_state.pop("force_deep", False)
+    
+    if prompt:
         if not st.session_state.article_content:
             st.error("❌ Please load at least one article first")
         else:
-            st.session_state.messages.append({"role": "user", "content": prompt})
-            with st.chat_message("user"):
-                st.markdown(prompt)
+            if not regenerate:
+                st.session_state.messages.append({"role": "user", "content": prompt})
+                with st.chat_message("user"):
+                    st.markdown(prompt)
             
             with st.chat_message("assistant"):
-                with st.spinner("Thinking..."):
-                    combined_context = "\n\n---\n\n".join(
-                        f"Article from {url}:\n{content}" 
-                        for url, content in st.session_state.article_content.items()
-                    )
-                    
-                    response = query_groq(prompt, combined_context, groq_api_key)
+                # Recent turns verbatim plus a rolling summary of older ones
+                history = build_history(st.session_state.messages, st.session_state.chat_summary)
+                answer_cache = get_answer_cache()
+                cache_key = answer_cache_key(
+                    prompt,
+                    st.session_state.article_content,
+                    # Routed answers may come from either model
+                    "auto" if get_setting("routing", "enabled", True) else GROQ_MODEL,
+                    GROQ_TEMPERATURE,
+                    "digest" if st.session_state.get("digest_mode") else "retrieval",
+                    history,
+                )
+                response = None if regenerate else answer_cache.get(cache_key)
+                
+                if response is not None:
+                    metrics = {"cached": True}
                     st.markdown(response)
+                    st.caption(format_answer_metrics(metrics))
+                else:
+                    if st.session_state.get("digest_mode"):
+                        articles = st.session_state.article_content
+                        progress = st.progress(0.0, text=f"Summarizing {len(articles)} articles...")
+
+                        def report(url, summary, done, total):
+                            progress.progress(done / total, text=f"Summarized {done}/{total}")
+
+                        summaries = summarize_articles(articles, groq_api_key, on_result=report)
+                        progress.empty()
+                        failed = [url for url, summary in summaries.items() if summary.startswith("Error")]
+                        if failed:
+                            st.warning(f"⚠️ Couldn't summarize {len(failed)} article(s); they were left out of the digest.")
+                        combined_context = build_digest_context(articles, summaries)
+                    else:
+                        st.session_state.article_index.sync(st.session_state.article_content)
+                        # A follow-up ("what did he say next?") is searched along with the question before it
+                        last_turn = chat_turns(st.session_state.messages)[-1:]
+                        combined_context = build_retrieval_context(
+                            st.session_state.article_index,
+                            " ".join([question for question, _ in last_turn] + [prompt]),
+                            token_budget=get_setting("retrieval", "token_budget", 3000),
+                            top_k=get_setting("retrieval", "top_k", 8),
+                        )
+                    
+                    # An escalated answer is streamed over the fast model's in the same slot
+                    answer_slot = st.empty()
+
+                    def stream_answer(model, max_tokens, answer_metrics):
+                        return answer_slot.write_stream(
+                            stream_groq(
+                                prompt,
+                                combined_context,
+                                groq_api_key,
+                                answer_metrics,
+                                history=history,
+                                model=model,
+                                max_tokens=max_tokens,
+                            )
+                        )
+
+                    response, metrics = answer_routed(prompt, combined_context, stream_answer, force_deep)
+                    if format_answer_metrics(metrics):
+                        st.caption(format_answer_metrics(metrics))
+                    if "error" not in metrics:
+                        answer_cache.put(cache_key, response)
             
-            st.session_state.messages.append({"role": "assistant", "content": response})
+            st.session_state.messages.append({"role": "assistant", "content": response, "metrics": metrics})
+            try:
+                update_chat_summary(st.session_state.chat_summary, st.session_state.messages, groq_api_key)
+            except Exception:
+                # Unfolded turns stay in the verbatim history; the next answer retries the fold
+                pass
+    
+    # Regenerate the last answer, bypassing the answer cache
+    if st.session_state.messages and st.session_state.messages[-1]["role"] == "assistant":
+        last_metrics = st.session_state.messages[-1].get("metrics") or {}
+        col1, col2 = st.columns([1, 3])
+        with col1:
+            if st.button("🔄 Regenerate", key="btn_regenerate"):
+                st.session_state.messages.pop()
+                st.session_state.regenerate_question = st.session_state.messages[-1]["content"]
+                st.rerun()
+        # Re-ask a quick answer of the larger model for more depth
+        if last_metrics.get("tier") == "fast":
+            with col2:
+                if st.button("🔬 Ask the larger model", key="btn_force_deep"):
+                    st.session_state.messages.pop()
+                    st.session_state.regenerate_question = st.session_state.messages[-1]["content"]
+                    st.session_state.force_deep = True
+                    st.rerun()
     
     # Instructions
     if not st.session_state.article_content:
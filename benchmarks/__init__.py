@@ -0,0 +1 @@
+"""Offline benchmarks for NEWSBOT (run with ``python -m benchmarks.run``)"""
@@ -0,0 +1,118 @@
+"""Deterministic news-page corpus and NewsAPI payloads for offline benchmarks"""
+import glob
+import json
+import os
+import random
+import re
+
+WORDS = (
+    "the government said on tuesday that markets would respond to new policy measures "
+    "analysts expect growth inflation rates central bank officials warned investors "
+    "according to a statement released late in the evening the minister confirmed"
+).split()
+
+
+def _sentence(rng, n=None):
+    n = n or rng.randint(8, 28)
+    words = [rng.choice(WORDS) for _ in range(n)]
+    if n > 12:
+        words[n // 2] += ","
+    return " ".join(words).capitalize() + "."
+
+
+def _paragraph(rng):
+    return " ".join(_sentence(rng) for _ in range(rng.randint(2, 6)))
+
+
+def _links(rng, n, cls):
+    items = "".join(f'<li><a href="/s/{i}">{_sentence(rng, 6)}</a></li>' for i in range(n))
+    return f'<ul class="{cls}">{items}</ul>'
+
+
+def generate_page(index, seed=7):
+    """Return (html, title, body_text) for one synthetic news article page.
+
+    Pages carry the boilerplate real news sites have: navigation, a cookie
+    banner, related stories, a sidebar, comments, a footer, inline scripts
+    and JSON-LD metadata. Three body layouts are rotated (article/p,
+    div-only paragraphs, main/section with an ad slot).
+    """
+    rng = random.Random(seed * 1000 + index)
+    title = _sentence(rng, 9).rstrip(".")
+    paragraphs = [_paragraph(rng) for _ in range(rng.randint(8, 40))]
+    nav = f'<nav class="site-nav">{_links(rng, 60, "menu")}</nav>'
+    cookie = (
+        '<div id="cookie-consent" class="banner">We use cookies to improve your experience. '
+        f"{_sentence(rng)} <button>Accept</button></div>"
+    )
+    related = f'<section class="related-stories"><h3>Related</h3>{_links(rng, 12, "related")}</section>'
+    comments = "".join(
+        f'<div class="comment"><p>{_paragraph(rng)}</p></div>' for _ in range(rng.randint(0, 15))
+    )
+    sidebar = f'<aside class="sidebar">{_links(rng, 20, "trending")}</aside>'
+    footer = f'<footer>{_links(rng, 30, "footer-links")}<p>© 2026 Example News</p></footer>'
+    json_ld = json.dumps({
+        "@type": "NewsArticle",
+        "headline": title,
+        "author": {"name": f"Reporter {index}"},
+        "datePublished": f"2026-10-{index % 28 + 1:02d}T08:00:00Z",
+    })
+    layout = index % 3
+    if layout == 0:
+        body = "".join(f"<p>{p}</p>" for p in paragraphs)
+        article = f'<article class="story"><h1>{title}</h1>{body}</article>'
+    elif layout == 1:
+        body = "".join(f"<div>{p}</div>" for p in paragraphs)
+        article = f'<div id="main-content"><h1>{title}</h1><div class="article-body">{body}</div></div>'
+    else:
+        half = len(paragraphs) // 2
+        first = "".join(f"<p>{p}</p>" for p in paragraphs[:half])
+        second = "".join(f"<p>{p}</p>" for p in paragraphs[half:])
+        article = (
+            f'<main><h1>{title}</h1><section class="entry">{first}'
+            f'<div class="ad-slot">Advertisement</div>{second}</section></main>'
+        )
+    scripts = "".join(
+        f"<script>var x{j} = {json.dumps(_paragraph(rng))};</script>" for j in range(rng.randint(5, 60))
+    )
+    html = (
+        f'<!doctype html><html><head><meta charset="utf-8"><title>{title} | Example</title>'
+        f'<meta property="og:title" content="{title}">'
+        f'<script type="application/ld+json">{json_ld}</script>{scripts}</head>'
+        f'<body><header>{nav}</header>{cookie}{article}{related}{sidebar}'
+        f'<div class="comments">{comments}</div>{footer}</body></html>'
+    )
+    return html, title, "\n\n".join(paragraphs)
+
+
+def load_corpus(count=30, saved_dir=None):
+    """{filename: html} from saved pages in saved_dir, or generated pages"""
+    if saved_dir:
+        pages = {}
+        for path in sorted(glob.glob(os.path.join(saved_dir, "*.html")))[:count]:
+            with open(path, "rb") as f:
+                pages[os.path.basename(path)] = f.read()
+        return pages
+    return {f"article_{i:03d}.html": generate_page(i)[0].encode("utf-8") for i in range(count)}
+
+
+def page_title(html):
+    match = re.search(rb"<title>(.*?)</title>", html, re.S | re.I)
+    return match.group(1).decode("utf-8", "replace").strip() if match else "Untitled"
+
+
+def newsapi_payload(site_url, pages, page_size):
+    """A NewsAPI response listing the corpus pages as articles"""
+    articles = []
+    for i, (name, html) in enumerate(list(pages.items())[:page_size]):
+        articles.append({
+            "source": {"id": None, "name": "Example News"},
+            "author": f"Reporter {i}",
+            "title": page_title(html),
+            "description": f"{page_title(html)}: what officials, analysts and investors said.",
+            "url": f"{site_url}/{name}",
+            "urlToImage": None,
+            "publishedAt": f"2026-10-{i % 28 + 1:02d}T08:00:00Z",
+            "content": "A benchmark article. [+1200 chars]",
+        })
+    return {"status": "ok", "totalResults": len(articles), "articles": articles}
@@ -0,0 +1,298 @@
+"""Offline benchmark suite for NEWSBOT.
+
+Runs the app and the newsbot core against local stand-ins for NewsAPI,
+the news sites and Groq (see benchmarks/standins.py), so numbers are
+repeatable and need no API keys or network. Measures:
+
+- extraction throughput: in-process parsing, and cold / warm /
+  revalidating bulk loads over HTTP;
+- rerun latency of the home, genre and research pages, cold and warm,
+  through Streamlit's AppTest harness;
+- prompt sizes sent to the LLM in retrieval and digest mode, and over
+  a long conversation;
+- memory held per research session.
+
+Usage::
+
+    python -m benchmarks.run [--pages 30] [--reruns 5] [--sessions 5] [--turns 10]
+                             [--saved-pages DIR] [-o bench_results.json]
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.fixtures import load_corpus
+from benchmarks.standins import StandIns
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, "app.py")
+SECRETS = {"groq": {"api_key": "bench"}, "newsapi": {"api_key": "bench"}}
+QUESTION = "What did officials say about inflation and the central bank?"
+
+
+def summarize(samples):
+    """Median, min and max of a list of timings, in milliseconds"""
+    return {
+        "runs": len(samples),
+        "median_ms": round(statistics.median(samples) * 1000, 2),
+        "min_ms": round(min(samples) * 1000, 2),
+        "max_ms": round(max(samples) * 1000, 2),
+    }
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def bench_extraction(pages, standins):
+    from newsbot import extract_articles_bulk, parse_article_html
+
+    start = time.perf_counter()
+    total_chars = sum(len(parse_article_html(html)) for html in pages.values())
+    parse_elapsed = time.perf_counter() - start
+
+    urls = [f"{standins.site_url}/{name}" for name in pages]
+    results = {
+        "pages": len(pages),
+        "html_bytes": sum(len(html) for html in pages.values()),
+        "in_process": {
+            "seconds": round(parse_elapsed, 4),
+            "pages_per_sec": round(len(pages) / parse_elapsed, 1),
+            "extracted_chars": total_chars,
+        },
+    }
+    for label, fresh_for in (("http_cold", None), ("http_warm", None), ("http_revalidate", "0")):
+        if fresh_for is not None:
+            os.environ["NEWSBOT_CACHE_ARTICLE_FRESH_FOR"] = fresh_for
+        before = dict(standins.counts)
+        elapsed, loaded = timed(lambda: extract_articles_bulk(urls))
+        os.environ.pop("NEWSBOT_CACHE_ARTICLE_FRESH_FOR", None)
+        results[label] = {
+            "seconds": round(elapsed, 4),
+            "pages_per_sec": round(len(loaded) / elapsed, 1),
+            "loaded": len(loaded),
+            "fetched": standins.counts["site"] - before["site"],
+            "not_modified": standins.counts["site_304"] - before["site_304"],
+        }
+    return results
+
+
+def new_app(page="home", **state):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP_PATH, default_timeout=120)
+    at.secrets.update(SECRETS)
+    at.session_state["page"] = page
+    for key, value in state.items():
+        at.session_state[key] = value
+    return at
+
+
+def bench_reruns(at, reruns):
+    """Time the first run of a fresh session, then plain reruns of it"""
+    first, _ = timed(at.run)
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    warm = [timed(at.run)[0] for _ in range(reruns)]
+    return first, warm
+
+
+def bench_pages(reruns, research_articles):
+    results = {}
+    pages = {
+        "home": {},
+        "genre": {
+            "selected_genre": "Business",
+            "genre_page_keyword": "business OR economy OR markets",
+        },
+        "research": {"article_content": research_articles},
+    }
+    for name, state in pages.items():
+        # The first session of the process pays for NewsAPI and cache
+        # warm-up; a second fresh session shows the process-warm cost.
+        page = "genre_page" if name == "genre" else name
+        cold_first, cold_reruns = bench_reruns(new_app(page, **state), reruns)
+        warm_first, warm_reruns = bench_reruns(new_app(page, **state), reruns)
+        results[name] = {
+            "cold_first_run_ms": round(cold_first * 1000, 2),
+            "warm_first_run_ms": round(warm_first * 1000, 2),
+            "rerun": summarize(cold_reruns + warm_reruns),
+        }
+    return results
+
+
+def prompt_stats(messages):
+    from newsbot.text import count_tokens
+
+    text = "".join(message["content"] for message in messages)
+    return {"chars": len(text), "tokens": count_tokens(text)}
+
+
+def bench_questions(standins, research_articles):
+    results = {}
+    for mode in ("retrieval", "digest"):
+        at = new_app("research", article_content=dict(research_articles), digest_mode=mode == "digest")
+        at.run()
+        sent_before = len(standins.prompts)
+        at.chat_input[0].set_value(f"{QUESTION} ({mode})")
+        elapsed, _ = timed(at.run)
+        if at.exception:
+            raise RuntimeError(at.exception[0].message)
+        prompts = standins.prompts[sent_before:]
+        answer = prompts[-1]
+        results[mode] = {
+            "question_ms": round(elapsed * 1000, 2),
+            "llm_calls": len(prompts),
+            "answer_prompt": prompt_stats(answer),
+        }
+        if len(prompts) > 1:
+            maps = [prompt_stats(p)["tokens"] for p in prompts[:-1]]
+            results[mode]["map_prompt_tokens"] = {"median": statistics.median(maps), "max": max(maps)}
+
+        # The same opening question in a new session is answered from the
+        # answer cache (within a conversation the history is part of the key).
+        at = new_app("research", article_content=dict(research_articles), digest_mode=mode == "digest")
+        at.run()
+        at.chat_input[0].set_value(f"{QUESTION} ({mode})")
+        cached, _ = timed(at.run)
+        results[mode]["cached_question_ms"] = round(cached * 1000, 2)
+    return results
+
+
+def bench_conversation(standins, research_articles, turns):
+    """Answer prompt size per turn of one long conversation, which should level off"""
+    at = new_app("research", article_content=dict(research_articles))
+    at.run()
+    prompt_tokens = []
+    summary_calls = 0
+    for turn in range(turns):
+        sent_before = len(standins.prompts)
+        at.chat_input[0].set_value(f"{QUESTION} (follow-up {turn + 1})")
+        at.run()
+        if at.exception:
+            raise RuntimeError(at.exception[0].message)
+        # The answer goes first; any later calls fold old turns into the summary
+        sent = standins.prompts[sent_before:]
+        prompt_tokens.append(prompt_stats(sent[0])["tokens"])
+        summary_calls += len(sent) - 1
+    return {"turns": turns, "answer_prompt_tokens": prompt_tokens, "summary_calls": summary_calls}
+
+
+def bench_memory(sessions, research_articles):
+    """Memory retained per research session, including its rendered element tree"""
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    apps = []
+    for _ in range(sessions):
+        # Fresh copies of the texts, as each session gets when it loads articles itself
+        articles = {url: text.encode().decode() for url, text in research_articles.items()}
+        at = new_app("research", article_content=articles)
+        # The second run drops the seeded value from the previous-run state
+        at.run()
+        at.run()
+        apps.append(at)
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "sessions": sessions,
+        "per_session_kib": round((current - baseline) / sessions / 1024, 1),
+        "peak_kib": round((peak - baseline) / 1024, 1),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run", description=__doc__.split("\n")[0])
+    parser.add_argument("--pages", type=int, default=30, help="Number of article pages in the corpus")
+    parser.add_argument("--saved-pages", help="Directory of saved *.html pages to replay instead of generated ones")
+    parser.add_argument("--research-articles", type=int, default=8, help="Articles loaded on the research page")
+    parser.add_argument("--reruns", type=int, default=5, help="Warm reruns timed per page")
+    parser.add_argument("--sessions", type=int, default=5, help="Sessions created for the memory measurement")
+    parser.add_argument("--turns", type=int, default=10, help="Questions asked in the conversation measurement")
+    parser.add_argument("--ttft", type=float, default=0.2, help="Stand-in Groq time to first token, in seconds")
+    parser.add_argument("--token-delay", type=float, default=0.002, help="Stand-in Groq delay per token, in seconds")
+    parser.add_argument("-o", "--output", default="bench_results.json", help="Where to write the JSON results")
+    args = parser.parse_args(argv)
+
+    pages = load_corpus(args.pages, args.saved_pages)
+    if not pages:
+        parser.error(f"no pages found in {args.saved_pages}")
+
+    with tempfile.TemporaryDirectory() as cache, StandIns(pages, args.ttft, args.token_delay) as standins:
+        # Settings are read from the environment on every lookup, so this
+        # must happen before the first newsbot singleton is created.
+        os.environ.update({
+            "NEWSBOT_CACHE_DIR": cache,
+            "NEWSBOT_NEWSAPI_BASE_URL": standins.newsapi_url,
+            "NEWSBOT_GROQ_BASE_URL": standins.groq_url,
+            # The stand-ins have no rate limits; don't let the free-tier
+            # defaults queue the measured requests.
+            "NEWSBOT_NEWSAPI_REQUESTS_PER_DAY": "1000000",
+            "NEWSBOT_GROQ_REQUESTS_PER_MINUTE": "1000000",
+            "NEWSBOT_GROQ_TOKENS_PER_MINUTE": "0",
+        })
+        if ROOT not in sys.path:
+            sys.path.insert(0, ROOT)
+        os.chdir(ROOT)
+
+        print(f"Extraction over {len(pages)} pages...", file=sys.stderr)
+        extraction = bench_extraction(pages, standins)
+
+        from newsbot import extract_articles_bulk
+
+        urls = [f"{standins.site_url}/{name}" for name in list(pages)[:args.research_articles]]
+        research_articles = extract_articles_bulk(urls)
+
+        print("Page reruns...", file=sys.stderr)
+        page_results = bench_pages(args.reruns, research_articles)
+        print("Questions...", file=sys.stderr)
+        questions = bench_questions(standins, research_articles)
+        print("Conversation...", file=sys.stderr)
+        conversation = bench_conversation(standins, research_articles, args.turns)
+        print("Memory...", file=sys.stderr)
+        memory = bench_memory(args.sessions, research_articles)
+
+        results = {
+            "meta": {
+                "revision": git_revision(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "args": vars(args),
+            },
+            "extraction": extraction,
+            "pages": page_results,
+            "questions": questions,
+            "conversation": conversation,
+            "memory": memory,
+            "requests": dict(standins.counts),
+        }
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(json.dumps(results, indent=2))
+    print(f"Results written to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""Local HTTP stand-ins for NewsAPI, news sites and the Groq chat completions API"""
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from benchmarks.fixtures import newsapi_payload
+
+
+class StandIns:
+    """One local server with three mounts.
+
+    /newsapi/v2/...   top-headlines and everything, listing the corpus
+    /site/<page>      the corpus pages, with ETag/Last-Modified and 304 support
+    /groq/openai/v1/chat/completions
+                      canned answers after ``ttft_s``, then ``answer_tokens``
+                      tokens ``token_delay_s`` apart; streaming or not
+    """
+
+    def __init__(self, pages, ttft_s=0.2, token_delay_s=0.005, answer_tokens=120):
+        self.pages = pages
+        self.ttft_s = ttft_s
+        self.token_delay_s = token_delay_s
+        self.answer_tokens = answer_tokens
+        self.prompts = []
+        self.counts = {"newsapi": 0, "site": 0, "site_304": 0, "groq": 0}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    @property
+    def newsapi_url(self):
+        return f"{self.base_url}/newsapi/v2"
+
+    @property
+    def site_url(self):
+        return f"{self.base_url}/site"
+
+    @property
+    def groq_url(self):
+        return f"{self.base_url}/groq"
+
+    def __enter__(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _count(self, name):
+        with self._lock:
+            self.counts[name] += 1
+
+    def _handler(self):
+        standins = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body, content_type="application/json", headers=None):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                if parts.path.startswith("/newsapi/v2/"):
+                    standins._count("newsapi")
+                    page_size = int(parse_qs(parts.query).get("pageSize", ["30"])[0])
+                    payload = newsapi_payload(standins.site_url, standins.pages, page_size)
+                    self._send(200, json.dumps(payload).encode())
+                elif parts.path.startswith("/site/"):
+                    html = standins.pages.get(parts.path[len("/site/"):])
+                    if html is None:
+                        self._send(404, b"not found", "text/plain")
+                        return
+                    etag = '"%s"' % hashlib.md5(html).hexdigest()
+                    if self.headers.get("If-None-Match") == etag:
+                        standins._count("site_304")
+                        self._send(304, b"", headers={"ETag": etag})
+                        return
+                    standins._count("site")
+                    self._send(200, html, "text/html; charset=utf-8", {
+                        "ETag": etag,
+                        "Last-Modified": "Mon, 12 Oct 2026 08:00:00 GMT",
+                    })
+                else:
+                    self._send(404, b"not found", "text/plain")
+
+            def do_POST(self):
+                if not self.path.startswith("/groq/"):
+                    self._send(404, b"not found", "text/plain")
+                    return
+                standins._count("groq")
+                request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with standins._lock:
+                    standins.prompts.append(request["messages"])
+                time.sleep(standins.ttft_s)
+                tokens = [f"word{i} " for i in range(standins.answer_tokens)]
+                if request.get("stream"):
+                    self._stream(request["model"], tokens)
+                else:
+                    time.sleep(standins.token_delay_s * len(tokens))
+                    self._send(200, json.dumps({
+                        "id": "bench",
+                        "object": "chat.completion",
+                        "created": int(time.time()),
+                        "model": request["model"],
+                        "choices": [{
+                            "index": 0,
+                            "message": {"role": "assistant", "content": "".join(tokens)},
+                            "finish_reason": "stop",
+                        }],
+                        "usage": {"prompt_tokens": 0, "completion_tokens": len(tokens), "total_tokens": len(tokens)},
+                    }).encode())
+
+            def _stream(self, model, tokens):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+
+                def event(data):
+                    body = f"data: {data}\n\n".encode()
+                    self.wfile.write(f"{len(body):x}\r\n".encode() + body + b"\r\n")
+                    self.wfile.flush()
+
+                def chunk(delta, finish_reason=None, **extra):
+                    return json.dumps({
+                        "id": "bench",
+                        "object": "chat.completion.chunk",
+                        "created": int(time.time()),
+                        "model": model,
+                        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+                        **extra,
+                    })
+
+                for token in tokens:
+                    event(chunk({"content": token}))
+                    time.sleep(standins.token_delay_s)
+                usage = {"prompt_tokens": 0, "completion_tokens": len(tokens), "total_tokens": len(tokens)}
+                event(chunk({}, "stop", x_groq={"id": "bench", "usage": usage}))
+                event("[DONE]")
+                self.wfile.write(b"0\r\n\r\n")
+
+        return Handler
@@ -0,0 +1,40 @@
+"""UI-free core of NEWSBOT: news fetching, article extraction, retrieval and answering.
+
+The Streamlit app (app.py) and the command line interface
+(``python -m newsbot``) are both thin layers over these modules.
+"""
+from newsbot.answers import AnswerCache, answer_cache_key, get_answer_cache
+from newsbot.articles import extract_article_content, extract_articles_bulk, parse_url_list
+from newsbot.config import get_api_key, get_setting, load_config_file
+from newsbot.extract import extract_main_content, parse_article_html
+from newsbot.llm import GROQ_MODEL, query_groq, stream_groq, summarize_articles
+from newsbot.news import GENRES, fetch_news_by_genre, fetch_top_headlines
+from newsbot.retrieval import ArticleIndex, build_retrieval_context
+from newsbot.store import ArticleStore, content_hash, get_article_store, normalize_url
+
+__all__ = [
+    "AnswerCache",
+    "ArticleIndex",
+    "ArticleStore",
+    "GENRES",
+    "GROQ_MODEL",
+    "answer_cache_key",
+    "build_retrieval_context",
+    "content_hash",
+    "extract_article_content",
+    "extract_articles_bulk",
+    "extract_main_content",
+    "fetch_news_by_genre",
+    "fetch_top_headlines",
+    "get_answer_cache",
+    "get_api_key",
+    "get_article_store",
+    "get_setting",
+    "load_config_file",
+    "normalize_url",
+    "parse_article_html",
+    "parse_url_list",
+    "query_groq",
+    "stream_groq",
+    "summarize_articles",
+]
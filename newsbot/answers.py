@@ -0,0 +1,109 @@
+"""Cache of answers to repeated questions over the same articles"""
+import functools
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from newsbot.config import cache_dir, get_setting
+from newsbot.metrics import metrics
+from newsbot.store import content_hash
+
+def normalize_question(question):
+    """Collapse case, whitespace and trailing punctuation so rephrasings share a key"""
+    return " ".join(question.lower().split()).rstrip("?!. ")
+
+def answer_cache_key(question, articles, model, temperature, mode, history=()):
+    """Cache key for a question over a set of loaded articles, in the context of any chat history"""
+    material = {
+        "question": normalize_question(question),
+        "articles": sorted(content_hash(text) for text in articles.values()),
+        "model": model,
+        "temperature": temperature,
+        "mode": mode,
+    }
+    if history:
+        material["history"] = list(history)
+    return hashlib.sha256(json.dumps(material, sort_keys=True).encode()).hexdigest()
+
+
+class AnswerCache:
+    """LRU cache of answers with a TTL and an optional SQLite layer shared across restarts"""
+
+    def __init__(self, max_entries=1000, ttl=86400, path=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "stores": 0}
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS answers ("
+                "key TEXT PRIMARY KEY, answer TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    def get(self, key):
+        """Return the cached answer for key, or None"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None and self._db is not None:
+                row = self._db.execute(
+                    "SELECT answer, created_at FROM answers WHERE key = ?", (key,)
+                ).fetchone()
+                entry = tuple(row) if row else None
+                if entry is not None:
+                    self._remember(key, entry)
+            if entry is None or now - entry[1] >= self.ttl:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry[0]
+
+    def put(self, key, answer):
+        """Cache an answer"""
+        now = time.time()
+        with self._lock:
+            self._remember(key, (answer, now))
+            self.stats["stores"] += 1
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO answers (key, answer, created_at) VALUES (?, ?, ?)",
+                    (key, answer, now),
+                )
+                self._db.execute("DELETE FROM answers WHERE created_at < ?", (now - self.ttl,))
+                self._db.commit()
+
+    def _remember(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def hit_rate(self):
+        """Fraction of lookups answered from the cache"""
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / lookups if lookups else 0.0
+
+
+@functools.lru_cache(maxsize=None)
+def get_answer_cache():
+    """Create the answer cache once per process"""
+    path = None
+    if get_setting("answers", "persist", True):
+        os.makedirs(cache_dir(), exist_ok=True)
+        path = os.path.join(cache_dir(), "answers.sqlite3")
+    cache = AnswerCache(
+        max_entries=get_setting("answers", "max_entries", 1000),
+        ttl=get_setting("answers", "ttl", 86400),
+        path=path,
+    )
+    metrics.register_stats("answers", lambda: cache.stats)
+    return cache
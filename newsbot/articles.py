@@ -0,0 +1,321 @@
+"""Downloading and extracting articles: single, bulk and prefetch"""
+import asyncio
+import functools
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from newsbot.config import get_setting
+from newsbot.extract import ArticleStreamParser, parse_article_html
+from newsbot.metrics import metrics
+from newsbot.store import get_article_store
+
+ARTICLE_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+DOWNLOAD_CHUNK_BYTES = 64 * 1024
+
+class DownloadStopped(Exception):
+    """Raised from an on_bytes callback to abandon a download in progress"""
+
+@functools.lru_cache(maxsize=None)
+def get_http_session():
+    """One keep-alive connection pool per process for single and prefetch downloads"""
+    session = requests.Session()
+    pool_size = get_setting("ingest", "max_connections", 10)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def check_article_headers(headers, max_bytes):
+    """Reject a response before reading its body if it isn't an HTML page or is too large"""
+    content_type = headers.get("Content-Type", "").split(";")[0].strip().lower()
+    if content_type and content_type not in HTML_CONTENT_TYPES:
+        raise ValueError(f"not an HTML page ({content_type})")
+    content_length = headers.get("Content-Length")
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+        raise ValueError(f"page too large ({int(content_length)} bytes, limit {max_bytes})")
+
+def fresh_cached_article(store, url, fresh_for):
+    """Return (stored record, text if it can be used without a request)"""
+    cached = store.get(url)
+    if cached and time.time() - cached["fetched_at"] < fresh_for:
+        return cached, cached["text"]
+    return cached, None
+
+def article_request_headers(cached):
+    """Request headers for an article download, conditional if we hold a stored copy"""
+    headers = dict(ARTICLE_HEADERS)
+    if cached:
+        if cached["etag"]:
+            headers["If-None-Match"] = cached["etag"]
+        if cached["last_modified"]:
+            headers["If-Modified-Since"] = cached["last_modified"]
+    return headers
+
+def finish_article_fetch(store, url, cached, status_code, content, response_headers):
+    """Turn a downloaded page into article text and update the store"""
+    if cached and status_code == 304:
+        store.mark_revalidated(url)
+        return cached["text"]
+
+    with metrics.timed("parse"):
+        text = parse_article_html(content)
+    metrics.inc("newsbot_chars_extracted_total", len(text))
+    if text:
+        store.put(
+            url,
+            text,
+            etag=response_headers.get("ETag"),
+            last_modified=response_headers.get("Last-Modified"),
+        )
+    return text
+
+def stream_article(session, store, url, cached, max_bytes, on_bytes=None):
+    """Download and parse an article chunk by chunk over a pooled requests session.
+
+    Non-HTML and oversized responses are rejected from their headers; the
+    body is read up to max_bytes, and reading stops early once enough
+    article text has arrived. on_bytes(n) is called for each chunk read
+    and may raise DownloadStopped to abandon the download; nothing is
+    stored then.
+    """
+    started = time.perf_counter()
+    received = 0
+    parse_s = 0.0
+    try:
+        response = session.get(url, headers=article_request_headers(cached), timeout=10, stream=True)
+        with response:
+            if cached and response.status_code == 304:
+                store.mark_revalidated(url)
+                return cached["text"]
+            response.raise_for_status()
+            check_article_headers(response.headers, max_bytes)
+
+            declared = "charset" in response.headers.get("Content-Type", "")
+            parser = ArticleStreamParser(
+                encoding=requests.utils.get_encoding_from_headers(response.headers) if declared else None
+            )
+            for chunk in response.iter_content(DOWNLOAD_CHUNK_BYTES):
+                chunk = chunk[:max_bytes - received]
+                received += len(chunk)
+                if on_bytes:
+                    on_bytes(len(chunk))
+                parse_started = time.perf_counter()
+                enough = parser.feed(chunk)
+                parse_s += time.perf_counter() - parse_started
+                if enough or received >= max_bytes:
+                    break
+    except DownloadStopped:
+        raise
+    except Exception as e:
+        metrics.inc("newsbot_errors_total", stage="download", type=type(e).__name__)
+        raise
+    finally:
+        metrics.observe("newsbot_stage_seconds", time.perf_counter() - started - parse_s, stage="download")
+        metrics.inc("newsbot_bytes_downloaded_total", received, source="article")
+
+    parse_started = time.perf_counter()
+    text = parser.close()
+    metrics.observe("newsbot_stage_seconds", parse_s + time.perf_counter() - parse_started, stage="parse")
+    metrics.inc("newsbot_chars_extracted_total", len(text))
+    if text:
+        store.put(
+            url,
+            text,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+        )
+    return text
+
+def extract_article_content(url):
+    """Extract text content from a news article URL"""
+    try:
+        store = get_article_store()
+        cached, text = fresh_cached_article(store, url, get_setting("cache", "article_fresh_for", 3600))
+        if text is not None:
+            return text
+        return stream_article(
+            get_http_session(), store, url, cached, get_setting("ingest", "max_page_bytes", 5 * 1024 * 1024)
+        )
+    except Exception as e:
+        return f"Error extracting content: {str(e)}"
+
+# --- Concurrent bulk ingestion ---
+def parse_url_list(text):
+    """Pick unique http(s) URLs out of pasted or uploaded text, one per line"""
+    urls = []
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith(("http://", "https://")) and line not in urls:
+            urls.append(line)
+    return urls
+
+async def _extract_articles_async(urls, on_result, store, fresh_for, per_host, max_connections, deadline, max_bytes):
+    loop = asyncio.get_running_loop()
+    host_slots = defaultdict(lambda: asyncio.Semaphore(per_host))
+    limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+
+    async with httpx.AsyncClient(timeout=10, limits=limits, follow_redirects=True) as client:
+        async def fetch_one(url):
+            try:
+                cached, text = fresh_cached_article(store, url, fresh_for)
+                if text is not None:
+                    return url, text
+                async with host_slots[urlsplit(url).netloc.lower()]:
+                    with metrics.timed("download"):
+                        content = bytearray()
+                        async with client.stream("GET", url, headers=article_request_headers(cached)) as response:
+                            if not (cached and response.status_code == 304):
+                                response.raise_for_status()
+                                check_article_headers(response.headers, max_bytes)
+                            async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_BYTES):
+                                content += chunk[:max_bytes - len(content)]
+                                if len(content) >= max_bytes:
+                                    break
+                        metrics.inc("newsbot_bytes_downloaded_total", len(content), source="article")
+                text = await loop.run_in_executor(
+                    None, finish_article_fetch,
+                    store, url, cached, response.status_code, bytes(content), response.headers,
+                )
+                return url, text
+            except Exception as e:
+                return url, f"Error extracting content: {str(e) or type(e).__name__}"
+
+        results = {}
+        pending = {asyncio.ensure_future(fetch_one(url)) for url in urls}
+        stop_at = loop.time() + deadline
+        while pending:
+            remaining = stop_at - loop.time()
+            if remaining <= 0:
+                break
+            done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                url, text = task.result()
+                results[url] = text
+                if on_result:
+                    on_result(url, text, len(results), len(urls))
+
+        for task in pending:
+            task.cancel()
+        for url in urls:
+            if url not in results:
+                results[url] = f"Error extracting content: deadline of {deadline}s exceeded"
+                if on_result:
+                    on_result(url, results[url], len(results), len(urls))
+        return results
+
+def extract_articles_bulk(urls, on_result=None):
+    """Extract many articles concurrently, calling on_result(url, text, done, total) as each lands"""
+    return asyncio.run(_extract_articles_async(
+        urls,
+        on_result,
+        store=get_article_store(),
+        fresh_for=get_setting("cache", "article_fresh_for", 3600),
+        per_host=get_setting("ingest", "per_host", 2),
+        max_connections=get_setting("ingest", "max_connections", 10),
+        deadline=get_setting("ingest", "deadline", 60),
+        max_bytes=get_setting("ingest", "max_page_bytes", 5 * 1024 * 1024),
+    ))
+
+
+# --- Speculative headline prefetch ---
+class PrefetchJob:
+    """Prefetch of one headline list; cancelled when the session shows a different list"""
+
+    def __init__(self, urls, byte_budget):
+        self.urls = tuple(urls)
+        self.byte_budget = byte_budget
+        self.bytes_used = 0
+        self.cancelled = threading.Event()
+        self._lock = threading.Lock()
+
+    def has_budget(self):
+        return not self.cancelled.is_set() and self.bytes_used < self.byte_budget
+
+    def charge(self, nbytes):
+        """Count downloaded bytes; raises DownloadStopped once the job is cancelled or over budget"""
+        with self._lock:
+            self.bytes_used += nbytes
+        if not self.has_budget():
+            raise DownloadStopped("prefetch cancelled or out of byte budget")
+
+
+class ArticlePrefetcher:
+    """Background thread pool that extracts headline articles into the article store"""
+
+    def __init__(self, store, fresh_for, max_workers=3, session=None, max_page_bytes=5 * 1024 * 1024):
+        self.store = store
+        self.fresh_for = fresh_for
+        self.session = session or requests.Session()
+        self.max_page_bytes = max_page_bytes
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.stats = {"fetched": 0, "skipped": 0, "cancelled": 0, "errors": 0}
+
+    def submit(self, job):
+        """Queue every URL of job that isn't already being fetched"""
+        for url in job.urls:
+            with self._lock:
+                if url in self._inflight:
+                    continue
+                future = self._pool.submit(self._fetch, job, url)
+                self._inflight[url] = future
+            future.add_done_callback(lambda _, url=url: self._done(url))
+
+    def _done(self, url):
+        with self._lock:
+            self._inflight.pop(url, None)
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _fetch(self, job, url):
+        if not job.has_budget():
+            self._count("cancelled")
+            return
+        cached, text = fresh_cached_article(self.store, url, self.fresh_for)
+        if text is not None:
+            self._count("skipped")
+            return
+        try:
+            stream_article(self.session, self.store, url, cached, self.max_page_bytes, on_bytes=job.charge)
+            self._count("fetched")
+        except DownloadStopped:
+            self._count("cancelled")
+        except Exception:
+            self._count("errors")
+
+    def wait_for(self, url, timeout):
+        """Block until an in-flight prefetch of url finishes, so a Load click reuses it"""
+        with self._lock:
+            future = self._inflight.get(url)
+        if future is not None:
+            try:
+                future.result(timeout=timeout)
+            except Exception:
+                pass
+
+
+@functools.lru_cache(maxsize=None)
+def get_prefetcher():
+    """Create the headline prefetcher once per process"""
+    prefetcher = ArticlePrefetcher(
+        get_article_store(),
+        fresh_for=get_setting("cache", "article_fresh_for", 3600),
+        max_workers=get_setting("prefetch", "max_workers", 3),
+        session=get_http_session(),
+        max_page_bytes=get_setting("ingest", "max_page_bytes", 5 * 1024 * 1024),
+    )
+    metrics.register_stats("prefetch", lambda: prefetcher.stats)
+    return prefetcher
@@ -0,0 +1,296 @@
+"""Command line interface for batch ingestion and question answering.
+
+    python -m newsbot ingest --urls urls.txt -o articles.jsonl
+    python -m newsbot ingest --genre Business --page-size 20 -o business.jsonl
+    python -m newsbot ask --articles articles.jsonl --questions questions.txt -o answers.jsonl
+    python -m newsbot poll --once
+    python -m newsbot search "central bank" -o hits.jsonl
+
+API keys come from GROQ_API_KEY / NEWSAPI_KEY or the [groq]/[newsapi]
+sections of the config file; other settings follow newsbot.config.
+"""
+import argparse
+import contextlib
+import json
+import logging
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from newsbot.answers import answer_cache_key, get_answer_cache
+from newsbot.articles import extract_articles_bulk, parse_url_list
+from newsbot.config import get_api_key, get_setting, load_config_file
+from newsbot.headlines import HeadlineScheduler, get_headline_store
+from newsbot.llm import GROQ_MODEL, GROQ_TEMPERATURE, build_digest_context, summarize_articles
+from newsbot.metrics import metrics
+from newsbot.news import GENRES, fetch_news_by_genre, fetch_top_headlines
+from newsbot.outbound import BATCH
+from newsbot.retrieval import ArticleIndex, build_retrieval_context
+from newsbot.routing import query_routed
+from newsbot.similarity import drop_near_duplicates
+from newsbot.store import content_hash
+
+SOURCE_LABEL_RE = re.compile(r"^\[Source \d+: (.+?)\]", re.M)
+
+
+def _open_output(path):
+    if path and path != "-":
+        return open(path, "w", encoding="utf-8")
+    return contextlib.nullcontext(sys.stdout)
+
+
+def _write(out, record):
+    out.write(json.dumps(record, ensure_ascii=False) + "\n")
+    out.flush()
+
+
+def _progress(message):
+    print(message, file=sys.stderr)
+
+
+def resolve_genre(name):
+    """Map a genre name such as "business" to its NewsAPI query"""
+    for label, query in GENRES.items():
+        if name.lower() in label.lower():
+            return query
+    raise ValueError(f"unknown genre {name!r}; choose from: {', '.join(GENRES)}")
+
+
+def _feed_articles(args):
+    """Headline metadata from NewsAPI for --genre/--query/--top"""
+    api_key = get_api_key("newsapi")
+    if not api_key:
+        raise ValueError("NEWSAPI_KEY is not set")
+    if args.top:
+        return fetch_top_headlines(api_key, page_size=args.page_size)
+    query = resolve_genre(args.genre) if args.genre else args.query
+    return fetch_news_by_genre(query, api_key, page_size=args.page_size)
+
+
+def cmd_ingest(args):
+    """Extract a URL list or news feed in parallel and write one JSON line per article"""
+    if args.urls:
+        with open(args.urls, encoding="utf-8") as f:
+            urls = parse_url_list(f.read())
+        metadata = {}
+    else:
+        feed = _feed_articles(args)
+        urls = parse_url_list("\n".join(a.get("url") or "" for a in feed))
+        metadata = {a.get("url"): a for a in feed}
+
+    def report(url, text, done, total):
+        _progress(f"[{done}/{total}] {'error' if text.startswith('Error') else 'ok'} {url}")
+
+    results = extract_articles_bulk(urls, on_result=report)
+    failures = 0
+    with _open_output(args.output) as out:
+        for url in urls:
+            text = results[url]
+            record = {"url": url}
+            feed_item = metadata.get(url)
+            if feed_item:
+                record["title"] = feed_item.get("title")
+                record["source"] = (feed_item.get("source") or {}).get("name")
+                record["published_at"] = feed_item.get("publishedAt")
+            if text.startswith("Error"):
+                failures += 1
+                record["error"] = text
+            else:
+                record["hash"] = content_hash(text)
+                record["text"] = text
+            _write(out, record)
+    _progress(f"extracted {len(urls) - failures}/{len(urls)} articles")
+    return 1 if urls and failures == len(urls) else 0
+
+
+def _load_articles(args):
+    """{url: text} from an ingest JSONL file or by extracting a URL list"""
+    if args.articles:
+        articles = {}
+        with open(args.articles, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    if record.get("text"):
+                        articles[record["url"]] = record["text"]
+        return articles
+    with open(args.urls, encoding="utf-8") as f:
+        results = extract_articles_bulk(parse_url_list(f.read()))
+    return {url: text for url, text in results.items() if not text.startswith("Error")}
+
+
+def _read_questions(path):
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+
+
+def cmd_ask(args):
+    """Answer every question in a file over one set of articles, one JSON line per answer"""
+    api_key = get_api_key("groq")
+    if not api_key:
+        raise ValueError("GROQ_API_KEY is not set")
+    articles = _load_articles(args)
+    if not articles:
+        raise ValueError("no articles could be loaded")
+    if get_setting("dedupe", "skip_articles", True):
+        articles, dropped = drop_near_duplicates(articles, get_setting("dedupe", "article_threshold", 0.8))
+        for url, duplicate_of in dropped.items():
+            _progress(f"skipping {url}: near-identical to {duplicate_of}")
+    questions = _read_questions(args.questions)
+    _progress(f"answering {len(questions)} questions over {len(articles)} articles")
+
+    mode = "digest" if args.digest else "retrieval"
+    if args.digest:
+        summaries = summarize_articles(articles, api_key)
+        digest_context = build_digest_context(articles, summaries)
+    else:
+        index = ArticleIndex(chunk_chars=get_setting("retrieval", "chunk_chars", 1200))
+        index.sync(articles)
+    answer_cache = get_answer_cache()
+    routed = get_setting("routing", "enabled", True) and not args.deep
+
+    def answer(question):
+        started = time.perf_counter()
+        key = answer_cache_key(question, articles, "auto" if routed else GROQ_MODEL, GROQ_TEMPERATURE, mode)
+        cached = None if args.no_cache else answer_cache.get(key)
+        if args.digest:
+            context = digest_context
+        else:
+            context = build_retrieval_context(
+                index,
+                question,
+                token_budget=get_setting("retrieval", "token_budget", 3000),
+                top_k=get_setting("retrieval", "top_k", 8),
+            )
+        if cached is not None:
+            response, info = cached, {}
+        else:
+            # A batch run waits out Groq's rate limits rather than failing answers
+            response, info = query_routed(question, context, api_key, force_deep=args.deep, priority=BATCH)
+        record = {
+            "question": question,
+            "model": info.get("model"),
+            "route": info.get("route"),
+            "escalated_from": info.get("escalated_from"),
+            "mode": mode,
+            "sources": list(dict.fromkeys(SOURCE_LABEL_RE.findall(context))),
+            "cached": cached is not None,
+            "latency_s": round(time.perf_counter() - started, 3),
+        }
+        if response.startswith("Error querying Groq"):
+            record["error"] = response
+        else:
+            record["answer"] = response
+            if cached is None:
+                answer_cache.put(key, response)
+        return record
+
+    failures = 0
+    with _open_output(args.output) as out, ThreadPoolExecutor(max_workers=args.workers) as pool:
+        for done, record in enumerate(pool.map(answer, questions), 1):
+            failures += "error" in record
+            _write(out, record)
+            _progress(f"[{done}/{len(questions)}] {'error' if 'error' in record else 'ok'} {record['question'][:60]}")
+    return 1 if questions and failures == len(questions) else 0
+
+
+def cmd_poll(args):
+    """Poll NewsAPI into the local headline store, once or every [scheduler] interval seconds"""
+    api_key = get_api_key("newsapi")
+    if not api_key:
+        raise ValueError("NEWSAPI_KEY is not set")
+    scheduler = HeadlineScheduler(
+        get_headline_store(),
+        api_key,
+        interval=get_setting("scheduler", "interval", 3600),
+        page_size=get_setting("scheduler", "page_size", 100),
+        retention_days=get_setting("scheduler", "retention_days", 30),
+    )
+    for query in args.query or []:
+        scheduler.add_query(query)
+    while True:
+        scheduler.poll_once()
+        _progress(
+            f"polled {scheduler.stats['polls']} feeds, {scheduler.stats['new_headlines']} new headlines, "
+            f"{scheduler.stats['errors']} errors; {scheduler.store.count()} stored"
+        )
+        if args.once:
+            return 1 if scheduler.stats["polls"] == 0 else 0
+        try:
+            time.sleep(scheduler.interval)
+        except KeyboardInterrupt:
+            return 0
+
+
+def cmd_search(args):
+    """Full-text search of the local headline store, one JSON line per headline"""
+    hits = get_headline_store().search(" ".join(args.terms), limit=args.limit)
+    with _open_output(args.output) as out:
+        for article in hits:
+            _write(out, {
+                "url": article["url"],
+                "title": article["title"],
+                "source": article["source"]["name"],
+                "published_at": article["publishedAt"],
+            })
+    _progress(f"{len(hits)} headlines")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="newsbot", description="Batch news ingestion and research from the command line")
+    parser.add_argument("--config", help="TOML settings file (same layout as .streamlit/secrets.toml)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="log progress details")
+    parser.add_argument("--metrics", help="write stage timings and counters in Prometheus text format to this file on exit")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ingest = commands.add_parser("ingest", help="extract articles from a URL list or news feed to JSONL")
+    source = ingest.add_mutually_exclusive_group(required=True)
+    source.add_argument("--urls", help="file with one article URL per line")
+    source.add_argument("--genre", help=f"genre feed, one of: {', '.join(GENRES)}")
+    source.add_argument("--query", help="free-text NewsAPI query")
+    source.add_argument("--top", action="store_true", help="top headlines")
+    ingest.add_argument("--page-size", type=int, default=30, help="articles to request from NewsAPI")
+    ingest.add_argument("-o", "--output", help="JSONL output file (default: stdout)")
+    ingest.set_defaults(func=cmd_ingest)
+
+    ask = commands.add_parser("ask", help="answer a file of questions over a set of articles")
+    articles = ask.add_mutually_exclusive_group(required=True)
+    articles.add_argument("--articles", help="JSONL written by 'newsbot ingest'")
+    articles.add_argument("--urls", help="file with one article URL per line")
+    ask.add_argument("--questions", required=True, help="file with one question per line")
+    ask.add_argument("--digest", action="store_true", help="answer from per-article summaries")
+    ask.add_argument("--workers", type=int, default=4, help="questions answered in parallel")
+    ask.add_argument("--no-cache", action="store_true", help="ignore cached answers")
+    ask.add_argument("--deep", action="store_true", help="answer every question with the larger model")
+    ask.add_argument("-o", "--output", help="JSONL output file (default: stdout)")
+    ask.set_defaults(func=cmd_ask)
+
+    poll = commands.add_parser("poll", help="poll NewsAPI feeds into the local headline store")
+    poll.add_argument("--once", action="store_true", help="poll every feed once and exit")
+    poll.add_argument("--query", action="append", help="extra query to poll, e.g. a location (repeatable)")
+    poll.set_defaults(func=cmd_poll)
+
+    search = commands.add_parser("search", help="full-text search of the local headline store")
+    search.add_argument("terms", nargs="+", help="words that must all appear")
+    search.add_argument("--limit", type=int, default=30, help="maximum headlines returned")
+    search.add_argument("-o", "--output", help="JSONL output file (default: stdout)")
+    search.set_defaults(func=cmd_search)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, format="%(levelname)s %(name)s: %(message)s")
+    if args.config:
+        load_config_file(args.config)
+    try:
+        return args.func(args)
+    except (OSError, ValueError) as e:
+        parser.exit(2, f"newsbot: error: {e}\n")
+    finally:
+        if args.metrics:
+            with open(args.metrics, "w") as f:
+                f.write(metrics.render())
@@ -0,0 +1,78 @@
+"""Settings lookup shared by the Streamlit app and the CLI.
+
+A setting is addressed by section and key, as in ``[cache] dir``. Lookups
+check, in order:
+
+1. the environment, as ``NEWSBOT_<SECTION>_<KEY>`` (``NEWSBOT_CACHE_DIR``);
+2. a TOML config file: ``$NEWSBOT_CONFIG``, ``newsbot.toml``, or one passed
+   to :func:`load_config_file`;
+3. Streamlit secrets, when the app has registered them with
+   :func:`use_secrets`;
+4. the default given by the caller.
+
+Environment values are converted to the type of the default.
+"""
+import os
+import tomllib
+
+_config = {}
+_secrets = None
+
+API_KEY_ENV = {
+    "groq": "GROQ_API_KEY",
+    "newsapi": "NEWSAPI_KEY",
+}
+
+
+def load_config_file(path):
+    """Read settings from a TOML file, overriding any previously loaded file"""
+    global _config
+    with open(path, "rb") as f:
+        _config = tomllib.load(f)
+
+
+def use_secrets(secrets):
+    """Register a secrets mapping (e.g. st.secrets) as a settings source"""
+    global _secrets
+    _secrets = secrets
+
+
+def _convert(value, default):
+    if isinstance(default, bool):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    if isinstance(default, int):
+        return int(value)
+    if isinstance(default, float):
+        return float(value)
+    return value
+
+
+def get_setting(section, key, default):
+    """Look up a setting, falling back to a default"""
+    env_value = os.environ.get(f"NEWSBOT_{section}_{key}".upper())
+    if env_value is not None:
+        return _convert(env_value, default)
+    if key in _config.get(section, {}):
+        return _config[section][key]
+    if _secrets is not None:
+        try:
+            return _secrets.get(section, {}).get(key, default)
+        except Exception:
+            pass
+    return default
+
+
+def get_api_key(service):
+    """API key for "groq" or "newsapi", from its usual env var or the [service] api_key setting"""
+    return os.environ.get(API_KEY_ENV[service]) or get_setting(service, "api_key", "")
+
+
+def cache_dir():
+    """Directory holding the on-disk caches"""
+    return get_setting("cache", "dir", ".newsbot_cache")
+
+
+if os.environ.get("NEWSBOT_CONFIG"):
+    load_config_file(os.environ["NEWSBOT_CONFIG"])
+elif os.path.exists("newsbot.toml"):
+    load_config_file("newsbot.toml")
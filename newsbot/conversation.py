@@ -0,0 +1,156 @@
+"""Bounded chat history for follow-up questions.
+
+The last few turns are sent verbatim; older turns are folded into a
+rolling summary, one batch of newly aged-out turns at a time, so prompt
+size stays flat however long a conversation runs. The summary state is a
+plain dict kept next to the chat messages:
+``{"summary": str, "folded": number of turns folded in, "digest": hash of those turns}``.
+"""
+import json
+
+from newsbot.config import get_setting
+from newsbot.llm import GROQ_MODEL, create_completion, get_groq_client, record_usage
+from newsbot.outbound import BATCH, interactive_timeout
+from newsbot.store import content_hash
+from newsbot.text import count_tokens, truncate_to_tokens
+
+SUMMARY_SYSTEM_PROMPT = "You keep a running summary of a conversation between a user and a news research assistant."
+
+
+def new_chat_summary():
+    return {"summary": "", "folded": 0, "digest": folded_digest([])}
+
+
+def folded_digest(turns):
+    """Fingerprint of the turns a summary covers"""
+    return content_hash(json.dumps(turns))
+
+
+def is_current(chat_summary, turns):
+    """Whether chat_summary summarizes the start of these turns rather than another conversation"""
+    folded = chat_summary.get("folded", 0)
+    return folded <= len(turns) and chat_summary.get("digest") == folded_digest(turns[:folded])
+
+
+def chat_turns(messages):
+    """(question, answer) pairs from chat messages, leaving out unanswered and failed questions"""
+    turns = []
+    question = None
+    for message in messages:
+        if message.get("role") == "user":
+            question = message["content"]
+        elif message.get("role") == "assistant" and question is not None:
+            if "error" not in (message.get("metrics") or {}):
+                turns.append((question, message["content"]))
+            question = None
+    return turns
+
+
+def split_history(turns, keep_turns=3, token_budget=1500):
+    """Split turns into (older, recent): recent are the last keep_turns that fit token_budget"""
+    recent = 0
+    used = 0
+    for question, answer in reversed(turns):
+        cost = count_tokens(question) + count_tokens(answer)
+        if recent == keep_turns or (recent and used + cost > token_budget):
+            break
+        recent += 1
+        used += cost
+    return turns[:len(turns) - recent], turns[len(turns) - recent:]
+
+
+def history_messages(chat_summary, recent_turns):
+    """Chat messages carrying the summary of older turns and the recent turns verbatim"""
+    messages = []
+    if chat_summary and chat_summary.get("summary"):
+        messages.append({
+            "role": "system",
+            "content": f"Summary of the earlier conversation:\n{chat_summary['summary']}",
+        })
+    for question, answer in recent_turns:
+        messages.append({"role": "user", "content": question})
+        messages.append({"role": "assistant", "content": answer})
+    return messages
+
+
+def build_history(messages, chat_summary):
+    """History messages for the next question: the rolling summary plus the turns it doesn't cover yet"""
+    turns = chat_turns(messages)
+    older, recent = split_history(
+        turns,
+        keep_turns=get_setting("chat", "keep_turns", 3),
+        token_budget=get_setting("chat", "history_tokens", 1500),
+    )
+    if chat_summary and not is_current(chat_summary, turns):
+        # Left over from a chat that was cleared under it
+        chat_summary = None
+    # Up to a batch of turns that aged out but aren't folded in yet (e.g.
+    # after a failed fold) are kept verbatim rather than dropped.
+    folded = chat_summary.get("folded", 0) if chat_summary else 0
+    start = max(folded, len(older) - get_setting("chat", "fold_batch", 4))
+    return history_messages(chat_summary, turns[start:len(older)] + recent)
+
+
+def fold_turns(client, summary, turns, model, max_tokens=300, turn_tokens=600):
+    """Fold turns into summary with one LLM call; returns the updated summary"""
+    exchanges = "\n\n".join(
+        f"User: {truncate_to_tokens(question, turn_tokens)}\nAssistant: {truncate_to_tokens(answer, turn_tokens)}"
+        for question, answer in turns
+    )
+    completion = create_completion(
+        client,
+        [
+            {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
+            {
+                "role": "user",
+                "content": f"""Update the summary with the new exchanges. Keep the topics, the articles and sources referred to, names, numbers and any conclusions the user may follow up on. Answer with the updated summary only, in under {max_tokens * 3 // 4} words.
+
+Current summary:
+{summary or "(none yet)"}
+
+New exchanges:
+{exchanges}""",
+            },
+        ],
+        max_tokens,
+        priority=BATCH,
+        # Runs while the page waits, so it mustn't queue indefinitely
+        timeout=interactive_timeout(),
+        model=model,
+        temperature=0.2,
+    )
+    record_usage(completion.usage)
+    return completion.choices[0].message.content.strip()
+
+
+def update_chat_summary(chat_summary, messages, api_key):
+    """Fold the next batch of turns that aged out of the verbatim window into the summary, in place.
+
+    Nothing happens until a full [chat] fold_batch of turns has aged out
+    (build_history sends those verbatim meanwhile), and each call folds
+    one batch, so it costs at most one LLM call per fold_batch answers; a
+    backlog (say, after a restore) catches up over the following answers.
+    Returns whether the summary changed.
+    """
+    turns = chat_turns(messages)
+    older, _ = split_history(
+        turns,
+        keep_turns=get_setting("chat", "keep_turns", 3),
+        token_budget=get_setting("chat", "history_tokens", 1500),
+    )
+    if not is_current(chat_summary, turns):
+        chat_summary.update(new_chat_summary())
+    batch = get_setting("chat", "fold_batch", 4)
+    if len(older) - chat_summary["folded"] < batch:
+        return False
+    pending = older[chat_summary["folded"]:chat_summary["folded"] + batch]
+    chat_summary["summary"] = fold_turns(
+        get_groq_client(api_key),
+        chat_summary["summary"],
+        pending,
+        GROQ_MODEL,
+        max_tokens=get_setting("chat", "summary_max_tokens", 300),
+    )
+    chat_summary["folded"] += len(pending)
+    chat_summary["digest"] = folded_digest(turns[:chat_summary["folded"]])
+    return True
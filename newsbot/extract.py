@@ -0,0 +1,231 @@
+"""Main-content extraction from article HTML"""
+import json
+import re
+
+import lxml.etree
+import lxml.html
+
+from newsbot.text import truncate_at_sentence
+
+STRIP_TAGS = (
+    "script", "style", "noscript", "nav", "footer", "header", "aside", "form",
+    "iframe", "svg", "button", "select", "template", "object", "embed",
+)
+UNLIKELY_RE = re.compile(
+    r"cookie|consent|gdpr|banner|related|recommend|comment|share|social|newsletter|"
+    r"subscribe|promo|sponsor|advert|\bad-|\bads?\b|popup|modal|sidebar|widget|"
+    r"footer|header|\bnav|menu|breadcrumb|outbrain|taboola|trending|most-?read",
+    re.I,
+)
+LIKELY_RE = re.compile(r"article|body|content|entry|main|post|story|text|column", re.I)
+BLOCK_TAGS = {"p", "pre", "blockquote", "div", "section", "article", "table", "ul", "ol", "h1", "h2", "h3", "h4", "h5", "h6", "li"}
+TEXT_TAGS = ("p", "h2", "h3", "h4", "li", "blockquote", "pre")
+TAG_WEIGHTS = {
+    "article": 10, "div": 5, "section": 3, "pre": 3, "td": 3, "blockquote": 3,
+    "address": -3, "ol": -3, "ul": -3, "dl": -3, "dd": -3, "form": -3,
+    "h1": -5, "h2": -5, "h3": -5, "h4": -5, "h5": -5, "h6": -5, "th": -5,
+}
+MIN_PARAGRAPH_CHARS = 25
+ARTICLE_MAX_CHARS = 15000
+
+def _squash(text):
+    return " ".join(text.split())
+
+def _class_weight(el):
+    weight = 0
+    for attr in (el.get("class"), el.get("id")):
+        if attr:
+            if UNLIKELY_RE.search(attr):
+                weight -= 25
+            if LIKELY_RE.search(attr):
+                weight += 25
+    return weight
+
+def _link_density(el, text_length):
+    if not text_length:
+        return 0.0
+    link_length = sum(len(_squash(a.text_content())) for a in el.iter("a"))
+    return min(link_length / text_length, 1.0)
+
+def _first_meta(doc, *names):
+    for name in names:
+        for value in doc.xpath(f'//meta[@property="{name}" or @name="{name}" or @itemprop="{name}"]/@content'):
+            if value.strip():
+                return value.strip()
+    return None
+
+def _json_ld_metadata(doc):
+    """Pull headline/author/datePublished out of JSON-LD blocks"""
+    found = {}
+    for block in doc.xpath('//script[@type="application/ld+json"]/text()'):
+        try:
+            data = json.loads(block)
+        except ValueError:
+            continue
+        items = data if isinstance(data, list) else data.get("@graph", [data]) if isinstance(data, dict) else []
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            found.setdefault("title", item.get("headline"))
+            found.setdefault("published", item.get("datePublished"))
+            author = item.get("author")
+            if isinstance(author, list):
+                author = author[0] if author else None
+            if isinstance(author, dict):
+                author = author.get("name")
+            if isinstance(author, str):
+                found.setdefault("author", author)
+    return {k: v for k, v in found.items() if isinstance(v, str) and v.strip()}
+
+def _parse_html_document(html):
+    if isinstance(html, bytes):
+        try:
+            html = html.decode("utf-8")
+        except UnicodeDecodeError:
+            return lxml.html.document_fromstring(html)
+    try:
+        return lxml.html.document_fromstring(html)
+    except ValueError:
+        # Unicode input with an XML encoding declaration
+        return lxml.html.document_fromstring(html.encode("utf-8"))
+
+def _extract_metadata(doc):
+    ld = _json_ld_metadata(doc)
+    title = _first_meta(doc, "og:title", "twitter:title") or ld.get("title")
+    if not title:
+        heading = doc.xpath("//h1")
+        title = _squash(heading[0].text_content()) if heading else _squash(doc.findtext(".//title") or "")
+    author = (
+        _first_meta(doc, "author", "article:author", "parsely-author", "sailthru.author")
+        or ld.get("author")
+    )
+    if not author:
+        byline = doc.xpath('//*[@rel="author" or @itemprop="author"]')
+        author = _squash(byline[0].text_content()) if byline else None
+    published = (
+        _first_meta(doc, "article:published_time", "datePublished", "pubdate", "date", "dc.date")
+        or ld.get("published")
+    )
+    if not published:
+        times = doc.xpath("//time/@datetime")
+        published = times[0] if times else None
+    return {"title": title or None, "author": author or None, "published": published}
+
+def _score_candidates(body):
+    scores = {}
+    for el in body.iter("p", "pre", "td", "blockquote", "div"):
+        if el.tag == "div" and any(child.tag in BLOCK_TAGS for child in el):
+            continue
+        text = _squash(el.text_content())
+        if len(text) < MIN_PARAGRAPH_CHARS:
+            continue
+        score = 1 + text.count(",") + min(len(text) // 100, 3)
+        parent = el.getparent()
+        for ancestor, share in ((parent, 1.0), (parent.getparent() if parent is not None else None, 0.5)):
+            if ancestor is None or not isinstance(ancestor.tag, str):
+                continue
+            if ancestor not in scores:
+                scores[ancestor] = TAG_WEIGHTS.get(ancestor.tag, 0) + _class_weight(ancestor)
+            scores[ancestor] += score * share
+
+    for el in scores:
+        scores[el] *= 1 - _link_density(el, len(_squash(el.text_content())))
+    return scores
+
+def _node_text(node):
+    parts = []
+    for el in node.iter(*TEXT_TAGS, "div"):
+        if el.tag == "div" and any(child.tag in BLOCK_TAGS for child in el):
+            continue
+        if any(ancestor.tag in TEXT_TAGS for ancestor in el.iterancestors() if ancestor is not node):
+            continue
+        text = _squash(el.text_content())
+        if text:
+            parts.append(text)
+    return "\n\n".join(parts) if parts else _squash(node.text_content())
+
+def extract_main_content(html):
+    """Isolate an article's body and metadata from its HTML.
+
+    Returns a dict with ``title``, ``author``, ``published`` and ``text``.
+    Paragraph-like blocks are scored readability-style (length, commas,
+    tag and class/id hints, link density) and the best-scoring container,
+    plus siblings that score close to it, is kept as the article body.
+    """
+    return _extract_from_document(_parse_html_document(html))
+
+def _extract_from_document(doc):
+    metadata = _extract_metadata(doc)
+
+    lxml.etree.strip_elements(doc, *STRIP_TAGS, lxml.etree.Comment, with_tail=False)
+    body = doc.find("body")
+    if body is None:
+        body = doc
+    for el in list(body.iter()):
+        if not isinstance(el.tag, str) or el.tag in ("body", "article", "main"):
+            continue
+        attrs = f"{el.get('class', '')} {el.get('id', '')}"
+        if UNLIKELY_RE.search(attrs) and not LIKELY_RE.search(attrs):
+            el.drop_tree()
+
+    scores = _score_candidates(body)
+    text = ""
+    if scores:
+        top = max(scores, key=scores.get)
+        threshold = max(10, scores[top] * 0.2)
+        parent = top.getparent()
+        siblings = list(parent) if parent is not None else [top]
+        parts = []
+        for node in siblings:
+            if node is top or scores.get(node, 0) >= threshold:
+                parts.append(_node_text(node))
+            elif node.tag == "p":
+                node_text = _squash(node.text_content())
+                if len(node_text) > 80 and _link_density(node, len(node_text)) < 0.25:
+                    parts.append(node_text)
+        text = "\n\n".join(part for part in parts if part)
+
+    if len(text) < 200:
+        text = _squash(body.text_content())
+
+    metadata["text"] = text
+    return metadata
+
+def _format_article(article):
+    header = "\n".join(
+        f"{label}: {article[field]}"
+        for label, field in (("Title", "title"), ("Author", "author"), ("Published", "published"))
+        if article[field]
+    )
+    text = f"{header}\n\n{article['text']}" if header else article["text"]
+
+    return truncate_at_sentence(text, ARTICLE_MAX_CHARS)
+
+def parse_article_html(html):
+    """Extract readable text from an article's HTML"""
+    return _format_article(extract_main_content(html))
+
+
+class ArticleStreamParser:
+    """Parse an article page chunk by chunk while it downloads.
+
+    ``feed`` returns True once the page has delivered ``enough_chars`` of
+    paragraph text, at which point the rest of the download can be
+    skipped: only ARTICLE_MAX_CHARS of it are kept. ``close`` extracts
+    the text from whatever has arrived, like parse_article_html.
+    """
+
+    def __init__(self, enough_chars=ARTICLE_MAX_CHARS * 3, encoding=None):
+        self.enough_chars = enough_chars
+        self.paragraph_chars = 0
+        self._parser = lxml.etree.HTMLPullParser(events=("end",), tag="p", encoding=encoding)
+        self._parser.set_element_class_lookup(lxml.html.HtmlElementClassLookup())
+
+    def feed(self, chunk):
+        self._parser.feed(chunk)
+        for _, paragraph in self._parser.read_events():
+            self.paragraph_chars += len(_squash(paragraph.text_content()))
+        return self.paragraph_chars >= self.enough_chars
+
+    def close(self):
+        return _format_article(_extract_from_document(self._parser.close()))
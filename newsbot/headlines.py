@@ -0,0 +1,351 @@
+"""Local history of NewsAPI headlines, filled by a background poller.
+
+The scheduler polls top-headlines, every genre query and any extra
+queries (such as user locations) into a SQLite database with an FTS5
+index. Genre queries ask only for items newer than the latest
+``publishedAt`` already stored; NewsAPI's top-headlines endpoint has no
+``from`` parameter, so it is re-read in full and merged by URL. Pages can
+then read recent headlines locally and search their history.
+"""
+import functools
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from newsbot.config import cache_dir, get_setting
+from newsbot.metrics import metrics
+from newsbot.news import GENRES, newsapi_request
+from newsbot.outbound import BACKGROUND
+from newsbot.similarity import dedupe_headlines
+from newsbot.store import normalize_url
+
+logger = logging.getLogger(__name__)
+
+TOP_HEADLINES = "top-headlines"
+
+
+def query_feed(query):
+    """Feed name for a NewsAPI "everything" query"""
+    return f"everything:{query}"
+
+
+def _fts_query(text):
+    """Quote each word so user input can't be read as FTS5 syntax"""
+    return " ".join('"' + word.replace('"', '""') + '"' for word in text.split())
+
+
+class HeadlineStore:
+    """SQLite store of NewsAPI articles with per-feed membership and an FTS5 index"""
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript("""
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS headlines (
+                id INTEGER PRIMARY KEY,
+                url_key TEXT UNIQUE NOT NULL,
+                url TEXT NOT NULL,
+                title TEXT,
+                description TEXT,
+                content TEXT,
+                source TEXT,
+                author TEXT,
+                url_to_image TEXT,
+                published_at TEXT NOT NULL,
+                first_seen REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS headlines_published ON headlines(published_at);
+            CREATE TABLE IF NOT EXISTS feed_items (
+                feed TEXT NOT NULL,
+                headline_id INTEGER NOT NULL REFERENCES headlines(id) ON DELETE CASCADE,
+                last_seen REAL NOT NULL,
+                PRIMARY KEY (feed, headline_id)
+            );
+            CREATE INDEX IF NOT EXISTS feed_items_seen ON feed_items(feed, last_seen);
+            CREATE TABLE IF NOT EXISTS feeds (
+                feed TEXT PRIMARY KEY,
+                last_published_at TEXT,
+                polled_at REAL
+            );
+            CREATE VIRTUAL TABLE IF NOT EXISTS headlines_fts USING fts5(
+                title, description, content, content='headlines', content_rowid='id'
+            );
+            CREATE TRIGGER IF NOT EXISTS headlines_ai AFTER INSERT ON headlines BEGIN
+                INSERT INTO headlines_fts (rowid, title, description, content)
+                VALUES (new.id, new.title, new.description, new.content);
+            END;
+            CREATE TRIGGER IF NOT EXISTS headlines_ad AFTER DELETE ON headlines BEGIN
+                INSERT INTO headlines_fts (headlines_fts, rowid, title, description, content)
+                VALUES ('delete', old.id, old.title, old.description, old.content);
+            END;
+            CREATE TRIGGER IF NOT EXISTS headlines_au AFTER UPDATE ON headlines BEGIN
+                INSERT INTO headlines_fts (headlines_fts, rowid, title, description, content)
+                VALUES ('delete', old.id, old.title, old.description, old.content);
+                INSERT INTO headlines_fts (rowid, title, description, content)
+                VALUES (new.id, new.title, new.description, new.content);
+            END;
+        """)
+        self._db.execute("PRAGMA foreign_keys=ON")
+
+    def add(self, feed, articles):
+        """Merge NewsAPI articles into feed; returns how many were new to the store"""
+        now = time.time()
+        added = 0
+        latest = None
+        with self._lock:
+            for article in articles:
+                url = article.get("url")
+                published_at = article.get("publishedAt")
+                if not url or not published_at or article.get("title") == "[Removed]":
+                    continue
+                latest = max(latest or published_at, published_at)
+                row = (
+                    normalize_url(url),
+                    url,
+                    article.get("title"),
+                    article.get("description"),
+                    article.get("content"),
+                    (article.get("source") or {}).get("name"),
+                    article.get("author"),
+                    article.get("urlToImage"),
+                    published_at,
+                    now,
+                )
+                cursor = self._db.execute(
+                    "INSERT INTO headlines (url_key, url, title, description, content, source, author, "
+                    "url_to_image, published_at, first_seen) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(url_key) DO NOTHING",
+                    row,
+                )
+                added += cursor.rowcount
+                self._db.execute(
+                    "INSERT INTO feed_items (feed, headline_id, last_seen) "
+                    "SELECT ?, id, ? FROM headlines WHERE url_key = ? "
+                    "ON CONFLICT(feed, headline_id) DO UPDATE SET last_seen = excluded.last_seen",
+                    (feed, now, row[0]),
+                )
+            self._db.execute(
+                "INSERT INTO feeds (feed, last_published_at, polled_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(feed) DO UPDATE SET polled_at = excluded.polled_at, "
+                "last_published_at = MAX(COALESCE(last_published_at, ''), COALESCE(excluded.last_published_at, ''))",
+                (feed, latest, now),
+            )
+            self._db.commit()
+        return added
+
+    def feed_state(self, feed):
+        """(latest publishedAt stored, time of last poll) for feed, or (None, None)"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT last_published_at, polled_at FROM feeds WHERE feed = ?", (feed,)
+            ).fetchone()
+        if row is None:
+            return None, None
+        return row[0] or None, row[1]
+
+    def latest(self, feed, limit=30):
+        """The feed's most recently seen headlines, newest first, as NewsAPI article dicts"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT h.url, h.title, h.description, h.content, h.source, h.author, h.url_to_image, "
+                "h.published_at FROM feed_items f JOIN headlines h ON h.id = f.headline_id "
+                "WHERE f.feed = ? ORDER BY f.last_seen DESC, h.published_at DESC LIMIT ?",
+                (feed, limit),
+            ).fetchall()
+        return [self._article(row) for row in rows]
+
+    def search(self, text, limit=30):
+        """Stored headlines matching every word of text, best matches first"""
+        query = _fts_query(text)
+        if not query:
+            return []
+        with metrics.timed("headline_search"), self._lock:
+            rows = self._db.execute(
+                "SELECT h.url, h.title, h.description, h.content, h.source, h.author, h.url_to_image, "
+                "h.published_at FROM headlines_fts JOIN headlines h ON h.id = headlines_fts.rowid "
+                "WHERE headlines_fts MATCH ? ORDER BY bm25(headlines_fts, 4.0, 2.0, 1.0), "
+                "h.published_at DESC LIMIT ?",
+                (query, limit),
+            ).fetchall()
+        return [self._article(row) for row in rows]
+
+    def prune(self, older_than_days):
+        """Forget headlines published more than older_than_days ago"""
+        cutoff = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(time.time() - older_than_days * 86400))
+        with self._lock:
+            deleted = self._db.execute("DELETE FROM headlines WHERE published_at < ?", (cutoff,)).rowcount
+            self._db.commit()
+        return deleted
+
+    def count(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM headlines").fetchone()[0]
+
+    @staticmethod
+    def _article(row):
+        url, title, description, content, source, author, url_to_image, published_at = row
+        return {
+            "source": {"id": None, "name": source},
+            "author": author,
+            "title": title,
+            "description": description,
+            "url": url,
+            "urlToImage": url_to_image,
+            "publishedAt": published_at,
+            "content": content,
+        }
+
+
+@functools.lru_cache(maxsize=None)
+def get_headline_store():
+    """Open the headline store once per process"""
+    os.makedirs(cache_dir(), exist_ok=True)
+    return HeadlineStore(os.path.join(cache_dir(), "headlines.sqlite3"))
+
+
+class HeadlineScheduler:
+    """Daemon thread polling NewsAPI feeds into a HeadlineStore every ``interval`` seconds.
+
+    Besides top headlines and the genre queries it polls queries added with
+    add_query. With ``query_ttl`` set, an added query is dropped once nobody
+    has asked for it for that many seconds, and at most ``max_queries`` of
+    the most recently asked-for ones are polled, so one-off locations don't
+    spend the NewsAPI quota forever.
+    """
+
+    def __init__(
+        self, store, api_key, interval=3600, page_size=100, retention_days=30, query_ttl=None, max_queries=None
+    ):
+        self.store = store
+        self.api_key = api_key
+        self.interval = interval
+        self.page_size = page_size
+        self.retention_days = retention_days
+        self.query_ttl = query_ttl
+        self.max_queries = max_queries
+        self.queries = list(dict.fromkeys(GENRES.values()))
+        self._asked_at = {}
+        self.stats = {"polls": 0, "new_headlines": 0, "errors": 0}
+        self._lock = threading.Lock()
+        self._attempted_at = {}
+        self._wake = threading.Event()
+        self._thread = None
+
+    def add_query(self, query):
+        """Also poll an "everything" query, e.g. a user's location; call again while it's still wanted"""
+        with self._lock:
+            if query in self.queries:
+                return
+            is_new = query not in self._asked_at
+            self._asked_at[query] = time.time()
+        if is_new:
+            self._wake.set()
+
+    def active_queries(self):
+        """Added queries still being asked for, most recent first"""
+        with self._lock:
+            if self.query_ttl is not None:
+                cutoff = time.time() - self.query_ttl
+                for query in [q for q, asked_at in self._asked_at.items() if asked_at < cutoff]:
+                    del self._asked_at[query]
+            active = sorted(self._asked_at, key=self._asked_at.get, reverse=True)
+        return active if self.max_queries is None else active[:self.max_queries]
+
+    def feeds(self):
+        queries = self.queries + self.active_queries()
+        return [TOP_HEADLINES] + [query_feed(q) for q in queries]
+
+    def poll_feed(self, feed):
+        """Fetch what's new in one feed and store it; returns the number of new headlines"""
+        if feed == TOP_HEADLINES:
+            articles = newsapi_request(
+                TOP_HEADLINES, {"language": "en", "pageSize": self.page_size}, self.api_key, BACKGROUND
+            )
+        else:
+            params = {
+                "q": feed.split(":", 1)[1],
+                "sortBy": "publishedAt",
+                "language": "en",
+                "pageSize": self.page_size,
+            }
+            since, _ = self.store.feed_state(feed)
+            if since:
+                params["from"] = since
+            articles = newsapi_request("everything", params, self.api_key, BACKGROUND)
+        return self.store.add(feed, articles)
+
+    def _last_polled(self, feed):
+        """Time of the last poll of feed, failed ones included, or None"""
+        _, polled_at = self.store.feed_state(feed)
+        attempted_at = self._attempted_at.get(feed)
+        return max(filter(None, (polled_at, attempted_at)), default=None)
+
+    def poll_once(self, due_only=False):
+        """Poll every feed once (or only those not polled for an interval); failures are logged and skipped"""
+        for feed in self.feeds():
+            if due_only:
+                polled_at = self._last_polled(feed)
+                if polled_at is not None and time.time() - polled_at < self.interval:
+                    continue
+            self._attempted_at[feed] = time.time()
+            try:
+                added = self.poll_feed(feed)
+            except Exception as e:
+                logger.warning("polling %s failed: %s", feed, e)
+                with self._lock:
+                    self.stats["errors"] += 1
+                continue
+            with self._lock:
+                self.stats["polls"] += 1
+                self.stats["new_headlines"] += added
+        self.store.prune(self.retention_days)
+
+    def _seconds_until_due(self):
+        wait = self.interval
+        for feed in self.feeds():
+            polled_at = self._last_polled(feed)
+            if polled_at is None:
+                return 0
+            wait = min(wait, polled_at + self.interval - time.time())
+        return max(wait, 1)
+
+    def _run(self):
+        while True:
+            self._wake.clear()
+            # Feeds polled recently, e.g. by another process, wait their turn
+            self.poll_once(due_only=True)
+            self._wake.wait(self._seconds_until_due())
+
+    def start(self):
+        """Start polling in a daemon thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="headline-scheduler", daemon=True)
+            self._thread.start()
+        return self
+
+
+@functools.lru_cache(maxsize=None)
+def get_headline_scheduler(api_key):
+    """Start the headline scheduler once per process"""
+    scheduler = HeadlineScheduler(
+        get_headline_store(),
+        api_key,
+        interval=get_setting("scheduler", "interval", 3600),
+        page_size=get_setting("scheduler", "page_size", 100),
+        retention_days=get_setting("scheduler", "retention_days", 30),
+        query_ttl=get_setting("scheduler", "query_ttl", 86400),
+        max_queries=get_setting("scheduler", "max_queries", 10),
+    )
+    metrics.register_stats("scheduler", lambda: scheduler.stats)
+    return scheduler.start()
+
+
+def stored_headlines(feed, limit, max_age):
+    """The feed's latest headlines if it was polled within max_age seconds, else None"""
+    _, polled_at = get_headline_store().feed_state(feed)
+    if polled_at is None or time.time() - polled_at > max_age:
+        return None
+    return dedupe_headlines(get_headline_store().latest(feed, limit)) or None
@@ -0,0 +1,263 @@
+"""Groq chat completions: streamed answers and map-reduce digests"""
+import functools
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from groq import Groq
+
+from newsbot.config import get_setting
+from newsbot.metrics import metrics as stage_metrics
+from newsbot.outbound import BATCH, INTERACTIVE, get_outbound, interactive_timeout
+from newsbot.store import content_hash, get_article_store
+from newsbot.text import count_tokens
+
+logger = logging.getLogger(__name__)
+
+GROQ_MODEL = "llama-3.3-70b-versatile"
+GROQ_TEMPERATURE = 0.3
+
+@functools.lru_cache(maxsize=None)
+def get_groq_client(api_key):
+    """Create one Groq client (and HTTP connection pool) per process.
+
+    Retries are left to the outbound scheduler, which shares rate-limit
+    pauses across every caller.
+    """
+    return Groq(api_key=api_key, base_url=get_setting("groq", "base_url", None), max_retries=0)
+
+def create_completion(client, messages, max_tokens, priority=INTERACTIVE, timeout=None, **kwargs):
+    """Create a chat completion once Groq's rate limits allow, charging prompt plus max_tokens tokens.
+
+    Interactive calls give up queueing after [outbound] interactive_timeout
+    unless a timeout is given; other calls wait as long as it takes.
+    """
+    prompt_tokens = sum(count_tokens(message["content"]) for message in messages)
+    if timeout is None and priority == INTERACTIVE:
+        timeout = interactive_timeout()
+    return get_outbound("groq").call(
+        lambda: client.chat.completions.create(messages=messages, max_tokens=max_tokens, **kwargs),
+        priority,
+        costs={"tokens": prompt_tokens + max_tokens},
+        timeout=timeout,
+    )
+
+def build_groq_messages(question, context, history=()):
+    """Build the chat messages for a question over article context.
+
+    The instructions and article context come first and don't depend on
+    the conversation, so providers can cache that prefix across turns;
+    history (see newsbot.conversation) and the question follow it.
+    """
+    system_prompt = f"""You are NEWSBOT, a helpful and accurate news research assistant. Based on the following article content, answer the user's questions accurately and concisely.
+
+Provide a clear, informative answer based solely on the article content, citing sources by their number (e.g. [Source 2]) when several articles are loaded. If the information isn't in the article, say so. Earlier turns of the conversation may follow; use them to make sense of follow-up questions.
+
+Article Content:
+{context}"""
+
+    return [
+        {
+            "role": "system",
+            "content": system_prompt
+        },
+        *history,
+        {
+            "role": "user",
+            "content": question
+        }
+    ]
+
+def record_usage(usage):
+    """Add a completion's token usage to the metrics"""
+    if usage is not None:
+        stage_metrics.inc("newsbot_llm_tokens_total", usage.prompt_tokens or 0, kind="prompt")
+        stage_metrics.inc("newsbot_llm_tokens_total", usage.completion_tokens or 0, kind="completion")
+
+def observe_answer(metrics):
+    """Export one answer's latency by model and log it"""
+    stage_metrics.observe("newsbot_answer_seconds", metrics["total_s"], model=metrics["model"])
+    logger.info("groq answer %s", json.dumps(metrics))
+
+def query_groq(
+    question, context, api_key, history=(), model=GROQ_MODEL, max_tokens=1024, metrics=None,
+    priority=INTERACTIVE, timeout=None,
+):
+    """Query Groq API with article context and optional chat history.
+
+    When a metrics dict is given it is filled with the model, latency and
+    finish reason of the answer. priority and timeout are passed on to
+    create_completion; batch callers use BATCH and no timeout.
+    """
+    metrics = {} if metrics is None else metrics
+    started = time.perf_counter()
+    try:
+        client = get_groq_client(api_key)
+
+        with stage_metrics.timed("llm"):
+            chat_completion = create_completion(
+                client,
+                build_groq_messages(question, context, history),
+                max_tokens,
+                priority=priority,
+                timeout=timeout,
+                model=model,
+                temperature=GROQ_TEMPERATURE,
+            )
+        record_usage(chat_completion.usage)
+        metrics["finish_reason"] = chat_completion.choices[0].finish_reason
+
+        return chat_completion.choices[0].message.content
+    except Exception as e:
+        metrics["error"] = type(e).__name__
+        return f"Error querying Groq: {str(e)}"
+    finally:
+        metrics["model"] = model
+        metrics["total_s"] = time.perf_counter() - started
+        observe_answer(metrics)
+
+def stream_groq(question, context, api_key, metrics, history=(), model=GROQ_MODEL, max_tokens=1024):
+    """Stream an answer from Groq, filling metrics with time-to-first-token and throughput"""
+    started = time.perf_counter()
+    first_token_at = None
+    chunks = 0
+    completion_tokens = None
+    usage = None
+    try:
+        client = get_groq_client(api_key)
+        stream = create_completion(
+            client,
+            build_groq_messages(question, context, history),
+            max_tokens,
+            model=model,
+            temperature=GROQ_TEMPERATURE,
+            stream=True,
+        )
+        for chunk in stream:
+            chunk_usage = getattr(getattr(chunk, "x_groq", None), "usage", None)
+            if chunk_usage is not None:
+                usage = chunk_usage
+                completion_tokens = usage.completion_tokens
+            if not chunk.choices:
+                continue
+            if chunk.choices[0].finish_reason:
+                metrics["finish_reason"] = chunk.choices[0].finish_reason
+            delta = chunk.choices[0].delta.content
+            if delta:
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                chunks += 1
+                yield delta
+    except Exception as e:
+        metrics["error"] = type(e).__name__
+        stage_metrics.inc("newsbot_errors_total", stage="llm", type=type(e).__name__)
+        yield f"Error querying Groq: {str(e)}"
+    finally:
+        finished = time.perf_counter()
+        tokens = completion_tokens if completion_tokens is not None else chunks
+        metrics["model"] = model
+        metrics["total_s"] = finished - started
+        metrics["completion_tokens"] = tokens
+        stage_metrics.observe("newsbot_stage_seconds", finished - started, stage="llm")
+        record_usage(usage)
+        if first_token_at is not None:
+            stage_metrics.observe("newsbot_stage_seconds", first_token_at - started, stage="llm_first_token")
+            metrics["ttft_s"] = first_token_at - started
+            generation_s = finished - first_token_at
+            metrics["tokens_per_s"] = tokens / generation_s if generation_s > 0 else None
+        observe_answer(metrics)
+
+def format_answer_metrics(metrics):
+    """One-line summary of answer latency for display under a chat message"""
+    if metrics.get("cached"):
+        return "💾 cached answer"
+    parts = []
+    if metrics.get("model"):
+        parts.append(metrics["model"])
+    if metrics.get("escalated_from"):
+        parts.append(f"escalated from {metrics['escalated_from']}")
+    if metrics.get("ttft_s") is not None:
+        parts.append(f"first token {metrics['ttft_s']:.2f}s")
+    if metrics.get("tokens_per_s"):
+        parts.append(f"{metrics['tokens_per_s']:.0f} tok/s")
+    if metrics.get("total_s") is not None:
+        parts.append(f"total {metrics['total_s']:.2f}s")
+    return "⚡ " + " · ".join(parts) if parts else ""
+
+
+# --- Map-reduce digest ---
+def summarize_article(client, text, model):
+    """Summarize one article's text for the digest"""
+    with stage_metrics.timed("summarize"):
+        completion = create_completion(
+            client,
+            [
+                {
+                    "role": "system",
+                    "content": "You are NEWSBOT, a helpful and accurate news research assistant."
+                },
+                {
+                    "role": "user",
+                    "content": f"""Summarize the following news article in 5-8 concise bullet points. Keep names, numbers, dates and claims exactly as stated, and note who said what.
+
+Article Content:
+{text}"""
+                }
+            ],
+            get_setting("digest", "summary_max_tokens", 350),
+            priority=BATCH,
+            model=model,
+            temperature=0.2,
+        )
+    record_usage(completion.usage)
+    return completion.choices[0].message.content.strip()
+
+def summarize_articles(articles, api_key, on_result=None):
+    """Summarize {url: text} in parallel, reusing summaries cached by content hash.
+
+    on_result(url, summary, done, total) is called from the calling thread
+    as each summary becomes available. Failed articles map to an
+    "Error summarizing article" string.
+    """
+    store = get_article_store()
+    client = get_groq_client(api_key)
+    max_workers = get_setting("digest", "max_workers", 4)
+    results = {}
+    pending = {}
+
+    def report(url, summary):
+        results[url] = summary
+        if on_result:
+            on_result(url, summary, len(results), len(articles))
+
+    def work(text, digest):
+        summary = summarize_article(client, text, GROQ_MODEL)
+        store.put_summary(digest, GROQ_MODEL, summary)
+        return summary
+
+    for url, text in articles.items():
+        digest = content_hash(text)
+        cached = store.get_summary(digest, GROQ_MODEL)
+        if cached:
+            report(url, cached)
+        else:
+            pending[url] = (text, digest)
+
+    if pending:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {pool.submit(work, *pending[url]): url for url in pending}
+            for future in as_completed(futures):
+                try:
+                    report(futures[future], future.result())
+                except Exception as e:
+                    report(futures[future], f"Error summarizing article: {str(e)}")
+    return results
+
+def build_digest_context(articles, summaries):
+    """Label each article's summary with its source for the reduce step"""
+    return "\n\n---\n\n".join(
+        f"[Source {n}: {url}] (summary)\n{summaries[url]}"
+        for n, url in enumerate(articles, 1)
+        if url in summaries and not summaries[url].startswith("Error")
+    )
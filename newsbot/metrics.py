@@ -0,0 +1,213 @@
+"""Per-stage timings and sizes, exported in Prometheus text format.
+
+Stages are timed with ``timed(stage)``; exceptions inside the block are
+counted in ``newsbot_errors_total`` by stage and exception type. Caches
+expose their existing ``stats`` dicts through ``register_stats`` and are
+read at scrape time.
+"""
+import bisect
+import contextlib
+import functools
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+HELP = {
+    "newsbot_stage_seconds": "Time spent in each pipeline stage",
+    "newsbot_bytes_downloaded_total": "Response bytes downloaded, by source",
+    "newsbot_chars_extracted_total": "Characters of article text extracted from downloaded pages",
+    "newsbot_llm_tokens_total": "LLM tokens used, by kind (prompt or completion)",
+    "newsbot_errors_total": "Errors by stage and exception type",
+    "newsbot_cache_events_total": "Cache events (hits, misses, ...) by cache",
+    "newsbot_outbound_queue_depth": "Requests waiting for an outbound rate-limit slot, by provider and priority",
+    "newsbot_outbound_wait_seconds": "Time requests waited for an outbound rate-limit slot",
+    "newsbot_outbound_retries_total": "Outbound requests retried after a rate limit or transient failure",
+    "newsbot_answer_seconds": "Time to produce a chat answer, by model",
+    "newsbot_routed_total": "Questions routed to each model tier, by reason",
+    "newsbot_escalations_total": "Fast-model answers re-asked of the larger model, by reason",
+    "newsbot_workspace_text_bytes": "Compressed article text held in memory for all sessions",
+    "newsbot_workspace_texts": "Distinct article texts held in memory",
+    "newsbot_workspace_sessions": "Live sessions with a workspace",
+    "newsbot_workspace_session_bytes": "Memory per session: its references plus a fair share of the texts it holds",
+}
+
+
+class Metrics:
+    """Thread-safe counters, gauges and latency histograms keyed by name and labels"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self._stats_sources = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def set_gauge(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._gauges[key] = value
+
+    def observe(self, name, seconds, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [[0] * (len(self.buckets) + 1), 0, 0.0]
+            histogram[0][bisect.bisect_left(self.buckets, seconds)] += 1
+            histogram[1] += 1
+            histogram[2] += seconds
+
+    @contextlib.contextmanager
+    def timed(self, stage):
+        """Time a block as one observation of stage, counting any exception it raises"""
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            self.inc("newsbot_errors_total", stage=stage, type=type(e).__name__)
+            raise
+        finally:
+            self.observe("newsbot_stage_seconds", time.perf_counter() - started, stage=stage)
+
+    def register_stats(self, cache, get_stats):
+        """Export get_stats() (a {event: count} dict) as newsbot_cache_events_total{cache=...}"""
+        with self._lock:
+            self._stats_sources[cache] = get_stats
+
+    def _cache_counters(self):
+        with self._lock:
+            sources = dict(self._stats_sources)
+        counters = {}
+        for cache, get_stats in sources.items():
+            try:
+                stats = dict(get_stats())
+            except Exception:
+                logger.exception("reading %s cache stats failed", cache)
+                continue
+            for event, count in stats.items():
+                counters[("newsbot_cache_events_total", (("cache", cache), ("event", event)))] = count
+        return counters
+
+    def stage_summary(self):
+        """{stage: {count, mean_s, p50_s, p95_s}} for display, with quantiles read off the buckets"""
+        with self._lock:
+            histograms = {
+                dict(labels)["stage"]: (list(buckets), count, total)
+                for (name, labels), (buckets, count, total) in self._histograms.items()
+                if name == "newsbot_stage_seconds"
+            }
+        summary = {}
+        for stage, (buckets, count, total) in sorted(histograms.items()):
+            summary[stage] = {
+                "count": count,
+                "mean_s": total / count if count else 0.0,
+                "p50_s": self._quantile(buckets, count, 0.5),
+                "p95_s": self._quantile(buckets, count, 0.95),
+            }
+        return summary
+
+    def _quantile(self, buckets, count, q):
+        seen = 0
+        for bound, n in zip(self.buckets + (float("inf"),), buckets):
+            seen += n
+            if seen >= q * count:
+                return bound
+        return float("inf")
+
+    def counters(self):
+        """All counters, including cache stats, as {(name, labels): value}"""
+        with self._lock:
+            counters = dict(self._counters)
+        counters.update(self._cache_counters())
+        return counters
+
+    def gauges(self):
+        """All gauges as {(name, labels): value}"""
+        with self._lock:
+            return dict(self._gauges)
+
+    def render(self):
+        """Prometheus text exposition of every metric"""
+        lines = []
+        described = set()
+
+        def describe(name, kind):
+            if name not in described:
+                described.add(name)
+                lines.append(f"# HELP {name} {HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in sorted(self.counters().items()):
+            describe(name, "counter")
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+
+        for (name, labels), value in sorted(self.gauges().items()):
+            describe(name, "gauge")
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+
+        with self._lock:
+            histograms = {key: (list(b), c, s) for key, (b, c, s) in self._histograms.items()}
+        for (name, labels), (buckets, count, total) in sorted(histograms.items()):
+            describe(name, "histogram")
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), buckets):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {total}")
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    parts = []
+    for key, value in labels:
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{key}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+metrics = Metrics()
+
+
+@functools.lru_cache(maxsize=None)
+def start_metrics_server(port, host="127.0.0.1"):
+    """Serve /metrics on host:port from a daemon thread, once per process"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    try:
+        server = ThreadingHTTPServer((host, port), Handler)
+    except OSError as e:
+        logger.warning("metrics endpoint not started on %s:%s: %s", host, port, e)
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logger.info("serving metrics on http://%s:%s/metrics", host, port)
+    return server
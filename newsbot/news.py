@@ -0,0 +1,206 @@
+"""NewsAPI access through a process-wide cache"""
+import functools
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+import requests
+
+from newsbot.config import cache_dir, get_setting
+from newsbot.metrics import metrics
+from newsbot.outbound import BACKGROUND, INTERACTIVE, get_outbound, interactive_timeout
+from newsbot.similarity import dedupe_headlines
+
+# News genres and keywords
+GENRES = {
+    "🤖 AI & Tech": "artificial intelligence technology",
+    "💼 Business": "business economy finance",
+    "📈 Stocks & Finance": "stocks finance cryptocurrency markets trading",
+    "🏥 Health": "health medical science",
+    "🌍 World": "world international news",
+    "⚽ Sports": "sports athletics games",
+    "🎬 Entertainment": "entertainment movies celebrity",
+    "🔬 Science": "science research discovery",
+    "🚀 Innovation": "innovation startup technology",
+    "🏛️ Politics": "politics government election policy"
+}
+
+
+class NewsCache:
+    """TTL cache shared by all sessions, with stale-while-revalidate and single-flight loads.
+
+    Entries younger than ``ttl`` are served as-is. Entries older than ``ttl``
+    but younger than ``ttl + stale_ttl`` are served immediately while one
+    background thread refreshes them. Concurrent misses for the same key wait
+    on a single upstream call. When ``disk_dir`` is set, entries are also
+    written there as JSON so a restarted process starts warm.
+
+    ``loader(priority)`` is called with INTERACTIVE when a caller waits on
+    the result and BACKGROUND for a stale-while-revalidate refresh, so
+    refreshes queue behind page loads for the upstream rate limit. A miss
+    never waits on a background refresh; it loads at INTERACTIVE itself.
+    """
+
+    def __init__(self, ttl=300, stale_ttl=900, disk_dir=None):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.disk_dir = disk_dir
+        self._entries = {}
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0, "errors": 0}
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def _disk_path(self, key):
+        digest = hashlib.sha1(json.dumps(key).encode()).hexdigest()
+        return os.path.join(self.disk_dir, f"news_{digest}.json")
+
+    def _load_from_disk(self, key):
+        if not self.disk_dir:
+            return None
+        try:
+            with open(self._disk_path(key)) as f:
+                record = json.load(f)
+            return record["value"], record["fetched_at"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _save_to_disk(self, key, value, fetched_at):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump({"key": key, "value": value, "fetched_at": fetched_at}, f)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
+
+    def _load(self, key, loader, future, priority=INTERACTIVE):
+        """Run the loader for key and publish its result to everyone waiting on future"""
+        try:
+            value = loader(priority)
+        except Exception as e:
+            with self._lock:
+                self.stats["errors"] += 1
+                self._forget_inflight(key, future)
+            future.set_exception(e)
+            return
+        fetched_at = time.time()
+        with self._lock:
+            self._entries[key] = (value, fetched_at)
+            self._forget_inflight(key, future)
+        self._save_to_disk(key, value, fetched_at)
+        future.set_result(value)
+
+    def _forget_inflight(self, key, future):
+        if self._inflight.get(key, (None,))[0] is future:
+            del self._inflight[key]
+
+    def get(self, key, loader):
+        """Return the cached value for key, calling loader(priority) at most once per refresh"""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            entry = self._load_from_disk(key)
+            if entry is not None:
+                with self._lock:
+                    self._entries.setdefault(key, entry)
+
+        now = time.time()
+        with self._lock:
+            if entry is not None:
+                value, fetched_at = entry
+                age = now - fetched_at
+                if age < self.ttl:
+                    self.stats["hits"] += 1
+                    return value
+                if age < self.ttl + self.stale_ttl:
+                    self.stats["stale_hits"] += 1
+                    if key not in self._inflight:
+                        self.stats["refreshes"] += 1
+                        future = Future()
+                        self._inflight[key] = (future, BACKGROUND)
+                        threading.Thread(
+                            target=self._load, args=(key, loader, future, BACKGROUND), daemon=True
+                        ).start()
+                    return value
+
+            self.stats["misses"] += 1
+            future, priority = self._inflight.get(key, (None, None))
+            # A background refresh may be queued for hours behind the rate
+            # limit; a waiting caller loads at interactive priority instead
+            is_leader = future is None or priority == BACKGROUND
+            if is_leader:
+                future = Future()
+                self._inflight[key] = (future, INTERACTIVE)
+
+        if is_leader:
+            self._load(key, loader, future)
+        return future.result()
+
+
+@functools.lru_cache(maxsize=None)
+def get_news_cache():
+    """Create the NewsAPI cache once per process"""
+    persist = get_setting("cache", "persist_news", True)
+    cache = NewsCache(
+        ttl=get_setting("cache", "news_ttl", 300),
+        stale_ttl=get_setting("cache", "news_stale_ttl", 900),
+        disk_dir=cache_dir() if persist else None,
+    )
+    metrics.register_stats("news", lambda: cache.stats)
+    return cache
+
+def newsapi_request(endpoint, params, api_key, priority=INTERACTIVE):
+    """Call a NewsAPI endpoint and return its article list, queued behind the NewsAPI rate limit"""
+    base_url = get_setting("newsapi", "base_url", "https://newsapi.org/v2")
+    url = f"{base_url.rstrip('/')}/{endpoint}"
+
+    def send():
+        with metrics.timed("newsapi"):
+            response = requests.get(url, params={**params, "apiKey": api_key}, timeout=10)
+            metrics.inc("newsbot_bytes_downloaded_total", len(response.content), source="newsapi")
+            response.raise_for_status()
+            return response.json()
+
+    timeout = interactive_timeout() if priority == INTERACTIVE else None
+    data = get_outbound("newsapi").call(send, priority, timeout=timeout)
+
+    if data.get("status") == "ok":
+        return data.get("articles", [])
+    else:
+        return []
+
+def fetch_news_by_genre(genre_keyword, api_key, page_size=10):
+    """Fetch news articles using NewsAPI based on genre keyword, syndicated copies collapsed"""
+    params = {
+        "q": genre_keyword,
+        "sortBy": "publishedAt",
+        "language": "en",
+        "pageSize": page_size,
+    }
+    key = ("everything", genre_keyword, page_size, "en")
+
+    def load(priority):
+        return newsapi_request("everything", params, api_key, priority)
+
+    return dedupe_headlines(get_news_cache().get(key, load))
+
+def fetch_top_headlines(api_key, page_size=30):
+    """Fetch top headlines from across the world, syndicated copies collapsed"""
+    params = {
+        "language": "en",
+        "pageSize": page_size,
+    }
+    key = ("top-headlines", None, page_size, "en")
+
+    def load(priority):
+        return newsapi_request("top-headlines", params, api_key, priority)
+
+    return dedupe_headlines(get_news_cache().get(key, load))
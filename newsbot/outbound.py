@@ -0,0 +1,220 @@
+"""Shared outbound scheduling for rate-limited APIs (NewsAPI and Groq).
+
+Every call to a provider takes a slot from that provider's token buckets
+(requests, and for Groq also tokens) before it is sent. Callers queue by
+priority, so an interactive chat answer goes ahead of digest summaries
+and background polling. A 429 pauses the whole provider for its
+Retry-After (or a jittered backoff), and the call is retried with
+tenacity. Queue depth and waits are exported through newsbot.metrics.
+"""
+import functools
+import heapq
+import itertools
+import threading
+import time
+
+import groq
+import requests
+import tenacity
+
+from newsbot.config import get_setting
+from newsbot.metrics import metrics
+
+INTERACTIVE = 0
+BATCH = 1
+BACKGROUND = 2
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BATCH: "batch", BACKGROUND: "background"}
+
+
+class OutboundQueueTimeout(Exception):
+    """No rate-limit slot could be had within the caller's timeout"""
+
+
+class TokenBucket:
+    """``capacity`` tokens, refilled continuously at ``per_second``; not thread-safe on its own"""
+
+    def __init__(self, capacity, per_second):
+        self.capacity = capacity
+        self.per_second = per_second
+        self.tokens = capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.per_second)
+        self._updated = now
+
+    def delay(self, cost, now):
+        """Seconds until cost tokens are available"""
+        self._refill(now)
+        cost = min(cost, self.capacity)
+        return 0.0 if self.tokens >= cost else (cost - self.tokens) / self.per_second
+
+    def take(self, cost):
+        self.tokens -= min(cost, self.capacity)
+
+
+def retry_after_seconds(error):
+    """The Retry-After header of a rate-limited response, in seconds, or None"""
+    try:
+        return float(error.response.headers["retry-after"])
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return None
+
+
+def status_code(error):
+    return getattr(getattr(error, "response", None), "status_code", None)
+
+
+def is_retryable(error):
+    """Rate limits, server errors and connection failures are worth retrying"""
+    if isinstance(error, (requests.ConnectionError, requests.Timeout, groq.APIConnectionError)):
+        return True
+    code = status_code(error)
+    return code is not None and (code == 429 or code >= 500)
+
+
+class OutboundScheduler:
+    """Priority queue in front of one provider's token buckets.
+
+    ``buckets`` maps a name to a TokenBucket; ``call(fn, priority, costs)``
+    waits until the caller is the highest-priority waiter and every bucket
+    can pay its cost, then runs fn, retrying retryable failures up to
+    ``max_attempts`` times.
+    """
+
+    def __init__(self, provider, buckets, max_attempts=5, max_backoff=60):
+        self.provider = provider
+        self.buckets = buckets
+        self.max_attempts = max_attempts
+        self.max_backoff = max_backoff
+        self._cond = threading.Condition()
+        self._waiting = []
+        self._sequence = itertools.count()
+        self._resume_at = 0.0
+
+    def _report_depth(self):
+        depth = dict.fromkeys(PRIORITY_NAMES.values(), 0)
+        for priority, _ in self._waiting:
+            depth[PRIORITY_NAMES.get(priority, str(priority))] += 1
+        for name, count in depth.items():
+            metrics.set_gauge("newsbot_outbound_queue_depth", count, provider=self.provider, priority=name)
+
+    def pause(self, seconds):
+        """Hold every caller back for seconds, e.g. after a 429"""
+        with self._cond:
+            self._resume_at = max(self._resume_at, time.monotonic() + seconds)
+            self._cond.notify_all()
+
+    def acquire(self, priority=INTERACTIVE, costs=None, timeout=None):
+        """Block until it's this caller's turn and the buckets can pay costs; returns seconds waited"""
+        costs = {"requests": 1, **(costs or {})}
+        started = time.monotonic()
+        deadline = None if timeout is None else started + timeout
+        entry = (priority, next(self._sequence))
+        with self._cond:
+            heapq.heappush(self._waiting, entry)
+            self._report_depth()
+            try:
+                while True:
+                    now = time.monotonic()
+                    delay = None
+                    if self._waiting[0] == entry:
+                        delay = max(
+                            [self._resume_at - now]
+                            + [bucket.delay(costs.get(name, 0), now) for name, bucket in self.buckets.items()]
+                        )
+                        if delay <= 0:
+                            for name, bucket in self.buckets.items():
+                                bucket.take(costs.get(name, 0))
+                            return now - started
+                    if deadline is not None:
+                        # Behind the head of the queue there's no predicted wait, only the deadline
+                        if now >= deadline or (delay is not None and now + delay > deadline):
+                            raise OutboundQueueTimeout(
+                                f"{self.provider} rate limit: no slot within {timeout:.0f}s"
+                            )
+                        remaining = deadline - now
+                        delay = remaining if delay is None else min(delay, remaining)
+                    self._cond.wait(delay)
+            finally:
+                self._waiting.remove(entry)
+                heapq.heapify(self._waiting)
+                self._report_depth()
+                self._cond.notify_all()
+                metrics.observe("newsbot_outbound_wait_seconds", time.monotonic() - started, provider=self.provider)
+
+    def _backoff(self, retry_state):
+        """Retry-After, or a jittered exponential backoff, capped at max_backoff"""
+        error = retry_state.outcome.exception()
+        seconds = retry_after_seconds(error)
+        if seconds is None:
+            seconds = tenacity.wait_random_exponential(multiplier=1, max=self.max_backoff)(retry_state)
+        return min(seconds, self.max_backoff)
+
+    def _before_retry(self, retry_state):
+        metrics.inc("newsbot_outbound_retries_total", provider=self.provider)
+
+    def call(self, fn, priority=INTERACTIVE, costs=None, timeout=None):
+        """Run fn() in turn under the rate limits, retrying rate limits and transient failures.
+
+        timeout covers the whole call, queueing and backoff included: a
+        retry that would have to wait past it raises OutboundQueueTimeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        def remaining():
+            return None if deadline is None else deadline - time.monotonic()
+
+        def attempt():
+            self.acquire(priority, costs, remaining())
+            return fn()
+
+        def wait(retry_state):
+            error = retry_state.outcome.exception()
+            seconds = self._backoff(retry_state)
+            if status_code(error) == 429:
+                self.pause(seconds)
+            if retry_state.attempt_number >= self.max_attempts:
+                # tenacity asks for the wait before checking stop; the error itself is re-raised
+                return 0
+            left = remaining()
+            if left is not None and seconds > left:
+                raise OutboundQueueTimeout(
+                    f"{self.provider} rate limit: retry in {seconds:.0f}s is past the {timeout:.0f}s timeout"
+                ) from error
+            return seconds
+
+        retrying = tenacity.Retrying(
+            retry=tenacity.retry_if_exception(is_retryable),
+            wait=wait,
+            stop=tenacity.stop_after_attempt(self.max_attempts),
+            before_sleep=self._before_retry,
+            reraise=True,
+        )
+        return retrying(attempt)
+
+
+def _per_minute_bucket(per_minute):
+    return TokenBucket(per_minute, per_minute / 60)
+
+
+@functools.lru_cache(maxsize=None)
+def get_outbound(provider):
+    """The process-wide scheduler for "newsapi" or "groq", with limits from settings"""
+    max_attempts = get_setting("outbound", "max_attempts", 5)
+    if provider == "newsapi":
+        per_day = get_setting("newsapi", "requests_per_day", 100)
+        buckets = {"requests": TokenBucket(per_day, per_day / 86400)}
+    elif provider == "groq":
+        buckets = {"requests": _per_minute_bucket(get_setting("groq", "requests_per_minute", 30))}
+        tokens_per_minute = get_setting("groq", "tokens_per_minute", 12000)
+        if tokens_per_minute:
+            buckets["tokens"] = _per_minute_bucket(tokens_per_minute)
+    else:
+        raise ValueError(f"unknown provider {provider!r}")
+    return OutboundScheduler(provider, buckets, max_attempts=max_attempts)
+
+
+def interactive_timeout():
+    """Longest an interactive request queues for a rate-limit slot before giving up"""
+    return get_setting("outbound", "interactive_timeout", 30)
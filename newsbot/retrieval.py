@@ -0,0 +1,232 @@
+"""BM25 retrieval over loaded articles and token-budgeted context packing"""
+import re
+import threading
+from collections import OrderedDict, defaultdict
+
+import numpy as np
+
+from newsbot.store import content_hash
+from newsbot.text import count_tokens, truncate_to_tokens
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have he her his in is it its of on or "
+    "that the their they this to was were will with what who which how why when".split()
+)
+TERM_RE = re.compile(r"\w+")
+CHUNK_CACHE_SIZE = 256
+
+_chunk_cache = OrderedDict()
+_chunk_cache_lock = threading.Lock()
+
+def tokenize_terms(text):
+    """Lowercased search terms with stopwords removed"""
+    return [t for t in TERM_RE.findall(text.lower()) if t not in STOPWORDS]
+
+def split_into_chunks(text, max_chars=1200):
+    """Split article text into paragraph-aligned chunks of at most max_chars"""
+    chunks = []
+    current = ""
+    for paragraph in text.split("\n\n"):
+        paragraph = paragraph.strip()
+        while len(paragraph) > max_chars:
+            cut = paragraph.rfind(". ", 0, max_chars) + 1 or max_chars
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(paragraph[:cut].strip())
+            paragraph = paragraph[cut:].strip()
+        if not paragraph:
+            continue
+        if current and len(current) + len(paragraph) + 2 > max_chars:
+            chunks.append(current)
+            current = paragraph
+        else:
+            current = f"{current}\n\n{paragraph}" if current else paragraph
+    if current:
+        chunks.append(current)
+    return chunks
+
+def article_chunks(text, digest, max_chars=1200):
+    """Chunks of text and their token counts, shared by every index that loads the same text"""
+    key = (digest, max_chars)
+    with _chunk_cache_lock:
+        cached = _chunk_cache.get(key)
+        if cached is not None:
+            _chunk_cache.move_to_end(key)
+            return cached
+    chunks = tuple(split_into_chunks(text, max_chars))
+    cached = (chunks, tuple(count_tokens(chunk) for chunk in chunks))
+    with _chunk_cache_lock:
+        _chunk_cache[key] = cached
+        if len(_chunk_cache) > CHUNK_CACHE_SIZE:
+            _chunk_cache.popitem(last=False)
+    return cached
+
+
+class ArticleIndex:
+    """Incremental BM25 index over chunks of the articles loaded in a session.
+
+    Postings are kept per term and scored with NumPy at query time. Removing
+    an article only marks its chunks dead; the index is compacted once dead
+    chunks outnumber live ones.
+    """
+
+    def __init__(self, chunk_chars=1200, k1=1.5, b=0.75):
+        self.chunk_chars = chunk_chars
+        self.k1 = k1
+        self.b = b
+        self._reset()
+
+    def _reset(self):
+        self.chunks = []
+        self.lengths = np.zeros(0, dtype=np.float32)
+        self.alive = np.zeros(0, dtype=bool)
+        self.postings = defaultdict(lambda: ([], []))
+        self.by_url = {}
+
+    def add(self, url, text):
+        """Index an article's text, replacing any previous version of url"""
+        if url in self.by_url:
+            self.remove(url)
+        digest = content_hash(text)
+        chunks, token_counts = article_chunks(text, digest, self.chunk_chars)
+        self._index_chunks(url, chunks, token_counts, digest)
+
+    def _index_chunks(self, url, chunks, token_counts, digest):
+        ids = []
+        lengths = []
+        for position, (chunk, tokens) in enumerate(zip(chunks, token_counts)):
+            chunk_id = len(self.chunks)
+            terms = tokenize_terms(chunk)
+            counts = defaultdict(int)
+            for term in terms:
+                counts[term] += 1
+            for term, tf in counts.items():
+                chunk_ids, tfs = self.postings[term]
+                chunk_ids.append(chunk_id)
+                tfs.append(tf)
+            self.chunks.append({"url": url, "position": position, "text": chunk, "tokens": tokens})
+            ids.append(chunk_id)
+            lengths.append(len(terms))
+        self.lengths = np.concatenate([self.lengths, np.asarray(lengths, dtype=np.float32)])
+        self.alive = np.concatenate([self.alive, np.ones(len(ids), dtype=bool)])
+        self.by_url[url] = {"ids": ids, "hash": digest}
+
+    def remove(self, url):
+        """Drop an article from the index"""
+        entry = self.by_url.pop(url, None)
+        if entry is None:
+            return
+        self.alive[entry["ids"]] = False
+        if (~self.alive).sum() > self.alive.sum():
+            self._compact()
+
+    def _compact(self):
+        live = [
+            (
+                url,
+                [self.chunks[i]["text"] for i in entry["ids"]],
+                [self.chunks[i]["tokens"] for i in entry["ids"]],
+                entry["hash"],
+            )
+            for url, entry in self.by_url.items()
+        ]
+        self._reset()
+        for url, chunks, token_counts, digest in live:
+            self._index_chunks(url, chunks, token_counts, digest)
+
+    def sync(self, articles):
+        """Bring the index in line with a {url: text} mapping, touching only changes"""
+        for url in list(self.by_url):
+            if url not in articles:
+                self.remove(url)
+        for url, text in articles.items():
+            entry = self.by_url.get(url)
+            if entry is None or entry["hash"] != content_hash(text):
+                self.add(url, text)
+
+    def search(self, query, top_k=8):
+        """Return up to top_k (score, chunk) pairs ranked by BM25"""
+        live_count = int(self.alive.sum())
+        if not live_count:
+            return []
+        scores = np.zeros(len(self.chunks), dtype=np.float32)
+        avg_length = float(self.lengths[self.alive].mean()) or 1.0
+        norm = self.k1 * (1 - self.b + self.b * self.lengths / avg_length)
+        for term in set(tokenize_terms(query)):
+            if term not in self.postings:
+                continue
+            chunk_ids, tfs = self.postings[term]
+            chunk_ids = np.asarray(chunk_ids)
+            tfs = np.asarray(tfs, dtype=np.float32)
+            live = self.alive[chunk_ids]
+            chunk_ids, tfs = chunk_ids[live], tfs[live]
+            if not len(chunk_ids):
+                continue
+            df = len(chunk_ids)
+            idf = np.log(1 + (live_count - df + 0.5) / (df + 0.5))
+            scores[chunk_ids] += idf * tfs * (self.k1 + 1) / (tfs + norm[chunk_ids])
+        ranked = np.argsort(-scores)[:top_k]
+        return [(float(scores[i]), self.chunks[i]) for i in ranked if scores[i] > 0]
+
+
+def allocate_budget(demands, budget):
+    """Split budget across articles max-min fairly.
+
+    Articles needing less than an equal share get what they need; the
+    surplus is shared among the rest.
+    """
+    allocation = {}
+    remaining = dict(demands)
+    while remaining:
+        share = budget // len(remaining)
+        satisfied = {key: need for key, need in remaining.items() if need <= share}
+        if not satisfied:
+            for key in remaining:
+                allocation[key] = share
+            break
+        for key, need in satisfied.items():
+            allocation[key] = need
+            budget -= need
+            del remaining[key]
+    return allocation
+
+def build_retrieval_context(index, question, token_budget, top_k=8, min_excerpt_tokens=40):
+    """Pack the chunks most relevant to question into token_budget, labelled by source.
+
+    Only the top_k search hits are sent, plus the opening chunk of any
+    article the search didn't hit so broad questions still see every
+    source. The budget is split fairly across articles, and the chunk that
+    overflows an article's share is cut at a sentence boundary rather than
+    mid-sentence.
+    """
+    sources = {url: n for n, url in enumerate(index.by_url, 1)}
+    ranked = {url: [] for url in index.by_url}
+    for _, chunk in index.search(question, top_k):
+        ranked[chunk["url"]].append(chunk)
+    for url, entry in index.by_url.items():
+        if not ranked[url] and entry["ids"]:
+            ranked[url].append(index.chunks[entry["ids"][0]])
+
+    demands = {url: sum(chunk["tokens"] for chunk in chunks) for url, chunks in ranked.items()}
+    allocation = allocate_budget(demands, token_budget)
+
+    selected = []
+    for url, chunks in ranked.items():
+        left = allocation.get(url, 0)
+        for chunk in chunks:
+            if chunk["tokens"] <= left:
+                selected.append((chunk, chunk["text"]))
+                left -= chunk["tokens"]
+            elif left >= min_excerpt_tokens:
+                excerpt = truncate_to_tokens(chunk["text"], left)
+                if excerpt:
+                    selected.append((chunk, excerpt))
+                break
+            else:
+                break
+
+    selected.sort(key=lambda item: (sources[item[0]["url"]], item[0]["position"]))
+    return "\n\n---\n\n".join(
+        f"[Source {sources[chunk['url']]}: {chunk['url']}]\n{text}" for chunk, text in selected
+    )
@@ -0,0 +1,148 @@
+"""Latency-tiered model choice for chat answers.
+
+Each question is classified without an LLM call, by its length, its type
+(a quick lookup or a brief summary versus an open or analytical question)
+and how much context it comes with. Simple questions go to a small, fast
+model with a short answer budget; everything else, and any question
+asking for depth, goes to the large model. A fast answer that looks
+unsure or got cut off is re-asked of the large model.
+"""
+import re
+
+from newsbot.config import get_setting
+from newsbot.llm import GROQ_MODEL, query_groq
+from newsbot.metrics import metrics as stage_metrics
+from newsbot.outbound import INTERACTIVE
+from newsbot.text import count_tokens
+
+FAST_MODEL = "llama-3.1-8b-instant"
+
+WORD_RE = re.compile(r"\w+")
+DEPTH_RE = re.compile(
+    r"\b(in (?:more )?(?:depth|detail)|more detail|elaborate|go deeper|dig deeper|deep dive|expand on|"
+    r"thorough(?:ly)?|comprehensive|step by step)\b",
+    re.I,
+)
+ANALYTICAL_RE = re.compile(
+    r"\b(why|compare|comparison|contrast|differ(?:s|ence|ent)?|analy[sz]e|analysis|explain|implications?|"
+    r"impacts?|consequences?|evaluate|assess|predict|outlook|pros|cons|trade-?offs?|relationship|"
+    r"should|would|could|what if)\b",
+    re.I,
+)
+LOOKUP_RE = re.compile(
+    r"^\s*(who|whom|whose|when|where|which|what(?:'s| is| was| are| were)?|how (?:many|much|old|long)|"
+    r"is|are|was|were|did|does|do|name|list)\b",
+    re.I,
+)
+BRIEF_SUMMARY_RE = re.compile(
+    r"\b(tl;?dr|one[- ](?:line|sentence)|in a (?:line|sentence)|headline|gist|briefly|in short|key points?)\b",
+    re.I,
+)
+LOW_CONFIDENCE_RE = re.compile(
+    r"\b(not (?:mentioned|specified|stated|provided|clear|sure)|"
+    r"(?:isn't|is not|aren't|are not|wasn't|was not) (?:in|mentioned|specified|stated|provided|clear)|"
+    r"(?:doesn't|does not|don't|do not) (?:say|mention|specify|state|provide|know)|"
+    r"(?:cannot|can't|unable to) (?:determine|find|answer|tell|say)|no information)\b",
+    re.I,
+)
+
+
+def question_type(question):
+    """Classify a question as analytical, brief summary, lookup or open"""
+    if ANALYTICAL_RE.search(question):
+        return "analytical"
+    if BRIEF_SUMMARY_RE.search(question):
+        return "brief summary"
+    if LOOKUP_RE.match(question):
+        return "lookup"
+    return "open"
+
+
+def route_question(question, context_tokens, force_deep=False):
+    """Pick the model for a question: {"tier", "model", "max_tokens", "reason"}"""
+    deep = {
+        "tier": "deep",
+        "model": GROQ_MODEL,
+        "max_tokens": get_setting("routing", "deep_max_tokens", 1024),
+    }
+    if force_deep:
+        return {**deep, "reason": "asked for the larger model"}
+    if not get_setting("routing", "enabled", True):
+        return {**deep, "reason": "routing off"}
+    kind = question_type(question)
+    if DEPTH_RE.search(question):
+        reason = "asks for depth"
+    elif kind in ("analytical", "open"):
+        reason = f"{kind} question"
+    elif len(WORD_RE.findall(question)) > get_setting("routing", "fast_max_words", 15):
+        reason = "long question"
+    elif context_tokens > get_setting("routing", "fast_max_context_tokens", 4000):
+        reason = "large context"
+    else:
+        return {
+            "tier": "fast",
+            "model": get_setting("routing", "fast_model", FAST_MODEL),
+            "max_tokens": get_setting("routing", "fast_max_tokens", 400),
+            "reason": kind,
+        }
+    return {**deep, "reason": reason}
+
+
+def escalation_reason(answer, metrics):
+    """Why a fast answer should be re-asked of the large model, or None if it will do"""
+    if not get_setting("routing", "escalate", True):
+        return None
+    if metrics.get("error"):
+        return "error"
+    if metrics.get("finish_reason") == "length":
+        return "cut off"
+    if len(answer.strip()) < 2 or LOW_CONFIDENCE_RE.search(answer):
+        return "low confidence"
+    return None
+
+
+def record_route(route):
+    stage_metrics.inc("newsbot_routed_total", tier=route["tier"], reason=route["reason"])
+
+
+def record_escalation(reason):
+    stage_metrics.inc("newsbot_escalations_total", reason=reason)
+
+
+def answer_routed(question, context, answer_fn, force_deep=False):
+    """Answer with the routed model, escalating a doubtful fast answer; returns (answer, metrics).
+
+    answer_fn(model, max_tokens, metrics) produces the answer text and
+    fills metrics the way query_groq and stream_groq do; it is called a
+    second time, with the large model, when a fast answer is escalated.
+    """
+    route = route_question(question, count_tokens(context), force_deep)
+    record_route(route)
+    metrics = {"tier": route["tier"], "route": route["reason"]}
+    answer = answer_fn(route["model"], route["max_tokens"], metrics)
+    reason = escalation_reason(answer, metrics) if route["tier"] == "fast" else None
+    if reason:
+        record_escalation(reason)
+        deep = route_question(question, 0, force_deep=True)
+        metrics = {"tier": "deep", "route": route["reason"], "escalated_from": route["model"], "escalation": reason}
+        answer = answer_fn(deep["model"], deep["max_tokens"], metrics)
+    return answer, metrics
+
+
+def query_routed(question, context, api_key, history=(), force_deep=False, priority=INTERACTIVE, timeout=None):
+    """answer_routed with query_groq; returns (answer, metrics)"""
+
+    def ask(model, max_tokens, metrics):
+        return query_groq(
+            question,
+            context,
+            api_key,
+            history,
+            model=model,
+            max_tokens=max_tokens,
+            metrics=metrics,
+            priority=priority,
+            timeout=timeout,
+        )
+
+    return answer_routed(question, context, ask, force_deep)
@@ -0,0 +1,168 @@
+"""Near-duplicate detection for syndicated stories.
+
+Headlines are compared by a 64-bit SimHash of their title and description,
+bucketed into eight 8-bit bands so only headlines sharing a band are
+compared (any pair within 7 bits of each other shares at least one band).
+Article texts are compared by MinHash signatures over word shingles, which
+estimate their Jaccard similarity. Fingerprints are cached per process
+(article signatures by content hash, so the cache holds no text), and
+repeated checks of the same list or article cost a lookup.
+"""
+import functools
+import hashlib
+import re
+import threading
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+from newsbot.config import get_setting
+from newsbot.store import content_hash
+
+WORD_RE = re.compile(r"\w+")
+SIMHASH_BITS = 64
+SIMHASH_BANDS = 8
+MINHASH_PERMUTATIONS = 128
+SHINGLE_WORDS = 5
+SIGNATURE_CACHE_SIZE = 1024
+
+# Universal hashing (a * x + b) mod p over 32-bit shingle hashes; a, b < 2**31
+# keep every intermediate below 2**64.
+_PRIME = np.uint64(4294967311)
+_rng = np.random.default_rng(20240229)
+_A = _rng.integers(1, 2 ** 31, size=MINHASH_PERMUTATIONS, dtype=np.uint64)
+_B = _rng.integers(0, 2 ** 31, size=MINHASH_PERMUTATIONS, dtype=np.uint64)
+_BIT_POSITIONS = np.arange(SIMHASH_BITS, dtype=np.uint64)
+_signatures = OrderedDict()
+_signatures_lock = threading.Lock()
+
+
+def headline_text(article):
+    """Title and description of a NewsAPI article, without the " - Outlet" title suffix"""
+    title = article.get("title") or ""
+    source = (article.get("source") or {}).get("name") or ""
+    for separator in (" - ", " | ", " – "):
+        if source and title.endswith(f"{separator}{source}"):
+            title = title[: -len(separator) - len(source)]
+    return title, article.get("description") or ""
+
+
+@functools.lru_cache(maxsize=8192)
+def simhash(title, description=""):
+    """64-bit SimHash of a headline.
+
+    The title carries twice the total weight of the description, however
+    long either is, so outlets' boilerplate descriptions can't make
+    different stories look alike.
+    """
+    title_words = WORD_RE.findall(title.lower())
+    description_words = WORD_RE.findall(description.lower())
+    weighted = [(word, 2 / len(title_words)) for word in title_words]
+    weighted += [(word, 1 / len(description_words)) for word in description_words]
+    if not weighted:
+        return 0
+    hashes = np.array(
+        [int.from_bytes(hashlib.blake2b(word.encode(), digest_size=8).digest(), "little") for word, _ in weighted],
+        dtype=np.uint64,
+    )
+    weights = np.array([weight for _, weight in weighted])
+    bits = ((hashes[:, None] >> _BIT_POSITIONS) & np.uint64(1)).astype(np.int64)
+    score = (weights[:, None] * (2 * bits - 1)).sum(axis=0)
+    return int(((score > 0).astype(np.uint64) << _BIT_POSITIONS).sum())
+
+
+def hamming_distance(a, b):
+    return (a ^ b).bit_count()
+
+
+def collapse_duplicate_headlines(articles, max_distance=6):
+    """Keep the first of each group of near-identical headlines.
+
+    Kept articles that absorbed others are returned as copies with the
+    dropped ones listed under "duplicates"; the input list is not modified.
+    """
+    band_bits = SIMHASH_BITS // SIMHASH_BANDS
+    band_mask = (1 << band_bits) - 1
+    buckets = {}
+    kept = []
+    fingerprints = []
+    for article in articles:
+        fingerprint = simhash(*headline_text(article))
+        bands = [(band, (fingerprint >> (band * band_bits)) & band_mask) for band in range(SIMHASH_BANDS)]
+        match = None
+        if fingerprint:
+            for band in bands:
+                for index in buckets.get(band, ()):
+                    if hamming_distance(fingerprint, fingerprints[index]) <= max_distance:
+                        match = index
+                        break
+                if match is not None:
+                    break
+        if match is None:
+            for band in bands:
+                buckets.setdefault(band, []).append(len(kept))
+            kept.append(article)
+            fingerprints.append(fingerprint)
+        else:
+            original = kept[match]
+            kept[match] = {**original, "duplicates": original.get("duplicates", []) + [article]}
+    return kept
+
+
+def dedupe_headlines(articles):
+    """Collapse syndicated copies in a headline list, unless turned off in settings"""
+    if not get_setting("dedupe", "headlines", True):
+        return articles
+    return collapse_duplicate_headlines(articles, get_setting("dedupe", "headline_max_distance", 6))
+
+
+def minhash_signature(text):
+    """MinHash signature of a text's word shingles (read-only array, cached by content hash)"""
+    digest = content_hash(text)
+    with _signatures_lock:
+        signature = _signatures.get(digest)
+        if signature is not None:
+            _signatures.move_to_end(digest)
+            return signature
+    words = WORD_RE.findall(text.lower())
+    if len(words) < SHINGLE_WORDS:
+        shingles = {" ".join(words)}
+    else:
+        shingles = {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+    hashes = np.fromiter((zlib.crc32(s.encode()) for s in shingles), dtype=np.uint64, count=len(shingles))
+    signature = ((_A[:, None] * hashes[None, :] + _B[:, None]) % _PRIME).min(axis=1)
+    signature.flags.writeable = False
+    with _signatures_lock:
+        _signatures[digest] = signature
+        if len(_signatures) > SIGNATURE_CACHE_SIZE:
+            _signatures.popitem(last=False)
+    return signature
+
+
+def estimated_jaccard(text_a, text_b):
+    return float(np.mean(minhash_signature(text_a) == minhash_signature(text_b)))
+
+
+def find_near_duplicate(text, articles, threshold=0.8):
+    """URL of the article in {url: text} most similar to text, if at least threshold similar"""
+    if not articles:
+        return None
+    urls = list(articles)
+    signatures = np.stack([minhash_signature(articles[url]) for url in urls])
+    similarity = (signatures == minhash_signature(text)).mean(axis=1)
+    best = int(similarity.argmax())
+    return urls[best] if similarity[best] >= threshold else None
+
+
+def drop_near_duplicates(articles, threshold=0.8):
+    """Split {url: text} into (kept, {dropped url: url of the kept copy})"""
+    kept = {}
+    dropped = {}
+    for url, text in articles.items():
+        duplicate_of = find_near_duplicate(text, kept, threshold)
+        if duplicate_of is None:
+            kept[url] = text
+        else:
+            dropped[url] = duplicate_of
+    return kept, dropped
@@ -0,0 +1,217 @@
+"""Persistent, compressed store of extracted article text"""
+import functools
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import zstandard
+
+from newsbot.config import cache_dir, get_setting
+from newsbot.metrics import metrics
+
+TRACKING_PARAMS = ("utm_", "fbclid", "gclid", "mc_cid", "mc_eid", "ocid", "cmpid")
+
+def normalize_url(url):
+    """Normalize an article URL so trivially different links share a cache entry"""
+    parts = urlsplit(url.strip())
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith(TRACKING_PARAMS)
+    )
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, urlencode(query), ""))
+
+def content_hash(text):
+    """Stable hash used to deduplicate article text"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+_zstd_contexts = threading.local()
+
+def zstd_compressor(level):
+    """This thread's ZstdCompressor for level (zstd contexts mustn't be shared between threads)"""
+    compressors = _zstd_contexts.__dict__.setdefault("compressors", {})
+    if level not in compressors:
+        compressors[level] = zstandard.ZstdCompressor(level=level)
+    return compressors[level]
+
+def zstd_decompressor():
+    """This thread's ZstdDecompressor"""
+    if not hasattr(_zstd_contexts, "decompressor"):
+        _zstd_contexts.decompressor = zstandard.ZstdDecompressor()
+    return _zstd_contexts.decompressor
+
+
+class ArticleStore:
+    """SQLite store of extracted article text keyed by normalized URL.
+
+    Text is zstd-compressed and stored once per content hash, so syndicated
+    copies of a story share a blob. Each URL keeps the ETag/Last-Modified
+    validators of its last download for conditional re-fetches. When the
+    compressed blobs exceed ``max_bytes`` the least recently used URLs are
+    evicted.
+    """
+
+    def __init__(self, path, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "revalidated": 0, "stores": 0, "evictions": 0}
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript("""
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS blobs (
+                hash TEXT PRIMARY KEY,
+                data BLOB NOT NULL,
+                size INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS urls (
+                url TEXT PRIMARY KEY,
+                hash TEXT NOT NULL REFERENCES blobs(hash),
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS urls_accessed ON urls(accessed_at);
+            CREATE INDEX IF NOT EXISTS urls_hash ON urls(hash);
+            CREATE TABLE IF NOT EXISTS summaries (
+                hash TEXT NOT NULL,
+                model TEXT NOT NULL,
+                summary TEXT NOT NULL,
+                PRIMARY KEY (hash, model)
+            );
+        """)
+
+    def get(self, url):
+        """Return the stored record for url, or None"""
+        url = normalize_url(url)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT u.hash, u.etag, u.last_modified, u.fetched_at, b.data "
+                "FROM urls u JOIN blobs b ON b.hash = u.hash WHERE u.url = ?",
+                (url,),
+            ).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            self.stats["hits"] += 1
+            self._db.execute("UPDATE urls SET accessed_at = ? WHERE url = ?", (time.time(), url))
+            self._db.commit()
+        digest, etag, last_modified, fetched_at, data = row
+        return {
+            "text": zstd_decompressor().decompress(data).decode("utf-8"),
+            "hash": digest,
+            "etag": etag,
+            "last_modified": last_modified,
+            "fetched_at": fetched_at,
+        }
+
+    def put(self, url, text, etag=None, last_modified=None):
+        """Store extracted text for url and evict old entries if over budget"""
+        url = normalize_url(url)
+        digest = content_hash(text)
+        now = time.time()
+        with self._lock:
+            if self._db.execute("SELECT 1 FROM blobs WHERE hash = ?", (digest,)).fetchone() is None:
+                data = zstd_compressor(10).compress(text.encode("utf-8"))
+                self._db.execute(
+                    "INSERT INTO blobs (hash, data, size) VALUES (?, ?, ?)", (digest, data, len(data))
+                )
+            self._db.execute(
+                "INSERT OR REPLACE INTO urls (url, hash, etag, last_modified, fetched_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (url, digest, etag, last_modified, now, now),
+            )
+            self.stats["stores"] += 1
+            self._evict()
+            self._db.commit()
+        return digest
+
+    def mark_revalidated(self, url):
+        """Record a 304 response: the stored text is still current"""
+        now = time.time()
+        with self._lock:
+            self.stats["revalidated"] += 1
+            self._db.execute(
+                "UPDATE urls SET fetched_at = ?, accessed_at = ? WHERE url = ?",
+                (now, now, normalize_url(url)),
+            )
+            self._db.commit()
+
+    def get_text(self, digest):
+        """Return the stored text with this content hash, or None"""
+        with self._lock:
+            row = self._db.execute("SELECT data FROM blobs WHERE hash = ?", (digest,)).fetchone()
+            if row is not None:
+                self._db.execute("UPDATE urls SET accessed_at = ? WHERE hash = ?", (time.time(), digest))
+                self._db.commit()
+        return zstd_decompressor().decompress(row[0]).decode("utf-8") if row else None
+
+    def has_text(self, digest):
+        with self._lock:
+            return self._db.execute("SELECT 1 FROM blobs WHERE hash = ?", (digest,)).fetchone() is not None
+
+    def spill(self, digest, data):
+        """Keep zstd-compressed text on disk, under a ``workspace:<hash>`` entry so it ages like any URL"""
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR IGNORE INTO blobs (hash, data, size) VALUES (?, ?, ?)", (digest, data, len(data))
+            )
+            self._db.execute(
+                "INSERT OR REPLACE INTO urls (url, hash, fetched_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (f"workspace:{digest}", digest, now, now),
+            )
+            self._evict()
+            self._db.commit()
+
+    def get_summary(self, digest, model):
+        """Return a cached summary of the text with this content hash, or None"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT summary FROM summaries WHERE hash = ? AND model = ?", (digest, model)
+            ).fetchone()
+        return row[0] if row else None
+
+    def put_summary(self, digest, model, summary):
+        """Cache a summary of the text with this content hash"""
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO summaries (hash, model, summary) VALUES (?, ?, ?)",
+                (digest, model, summary),
+            )
+            self._db.commit()
+
+    def size_bytes(self):
+        """Total compressed size of stored text"""
+        with self._lock:
+            return self._db.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+
+    def _evict(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+        while total > self.max_bytes:
+            row = self._db.execute("SELECT url, hash FROM urls ORDER BY accessed_at LIMIT 1").fetchone()
+            if row is None:
+                break
+            url, digest = row
+            self._db.execute("DELETE FROM urls WHERE url = ?", (url,))
+            self.stats["evictions"] += 1
+            if self._db.execute("SELECT 1 FROM urls WHERE hash = ?", (digest,)).fetchone() is None:
+                size = self._db.execute("SELECT size FROM blobs WHERE hash = ?", (digest,)).fetchone()[0]
+                self._db.execute("DELETE FROM blobs WHERE hash = ?", (digest,))
+                self._db.execute("DELETE FROM summaries WHERE hash = ?", (digest,))
+                total -= size
+
+
+@functools.lru_cache(maxsize=None)
+def get_article_store():
+    """Open the article store once per process"""
+    os.makedirs(cache_dir(), exist_ok=True)
+    store = ArticleStore(
+        os.path.join(cache_dir(), "articles.sqlite3"),
+        max_bytes=get_setting("cache", "article_max_bytes", 256 * 1024 * 1024),
+    )
+    metrics.register_stats("articles", lambda: store.stats)
+    return store
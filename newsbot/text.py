@@ -0,0 +1,60 @@
+"""Sentence splitting and token counting"""
+import functools
+import logging
+import re
+
+import tiktoken
+
+from newsbot.config import get_setting
+
+logger = logging.getLogger(__name__)
+
+SENTENCE_END_RE = re.compile(r"(?<=[.!?])[\"')\]]*\s+")
+
+def split_sentences(text):
+    """Split text into sentences, keeping each one's trailing whitespace"""
+    sentences = []
+    start = 0
+    for match in SENTENCE_END_RE.finditer(text):
+        sentences.append(text[start:match.end()])
+        start = match.end()
+    if start < len(text):
+        sentences.append(text[start:])
+    return sentences
+
+def truncate_at_sentence(text, max_chars):
+    """Cut text to at most max_chars, ending on a sentence boundary where possible"""
+    if len(text) <= max_chars:
+        return text
+    cut = max((m.end() for m in SENTENCE_END_RE.finditer(text, 0, max_chars + 1)), default=0)
+    return text[:cut].rstrip() if cut else text[:max_chars]
+
+@functools.lru_cache(maxsize=None)
+def get_token_encoder():
+    """Load the tiktoken encoding once per process, or None if it can't be loaded"""
+    try:
+        return tiktoken.get_encoding(get_setting("context", "encoding", "cl100k_base"))
+    except Exception as e:
+        logger.warning("tiktoken unavailable, estimating token counts: %s", e)
+        return None
+
+def count_tokens(text):
+    """Token count used for prompt budgeting"""
+    encoder = get_token_encoder()
+    if encoder is None:
+        return len(text) // 4 + 1
+    return len(encoder.encode(text, disallowed_special=()))
+
+def truncate_to_tokens(text, max_tokens):
+    """Keep whole sentences from the start of text until max_tokens is reached"""
+    if count_tokens(text) <= max_tokens:
+        return text
+    kept = []
+    used = 0
+    for sentence in split_sentences(text):
+        cost = count_tokens(sentence)
+        if used + cost > max_tokens:
+            break
+        kept.append(sentence)
+        used += cost
+    return "".join(kept).rstrip()
@@ -0,0 +1,342 @@
+"""Article text shared by every session, with sessions holding only references.
+
+Each distinct text is kept once per process, zstd-compressed and keyed by
+content hash, so fifty sessions reading the same story share one copy.
+Memory use is capped: the least recently used texts are spilled to the
+article store on disk and read back from there when next needed. A
+session's workspace is a mapping of URL to content hash that reads
+through to the shared texts.
+
+Workspaces can be saved as snapshots: the article list, each distinct
+text once by content hash, and the chat history with its rolling summary
+(see newsbot.conversation), packed with msgpack and zstd-compressed.
+Restoring re-links texts the server already holds without touching them.
+"""
+import functools
+import io
+import sys
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from collections.abc import MutableMapping
+
+import ormsgpack
+import zstandard
+
+from newsbot.config import get_setting
+from newsbot.metrics import metrics
+from newsbot.store import content_hash, get_article_store, zstd_compressor, zstd_decompressor
+
+
+SNAPSHOT_MAGIC = b"NBWS"
+SNAPSHOT_VERSION = 1
+# Answer metrics a restored chat shows (see newsbot.llm and newsbot.routing), by allowed type
+METRIC_NUMBER = (int, float, type(None))
+METRIC_TEXT = (str, type(None))
+SNAPSHOT_METRICS = {
+    "cached": (bool,),
+    "ttft_s": METRIC_NUMBER,
+    "tokens_per_s": METRIC_NUMBER,
+    "total_s": METRIC_NUMBER,
+    "completion_tokens": METRIC_NUMBER,
+    "model": METRIC_TEXT,
+    "error": METRIC_TEXT,
+    "finish_reason": METRIC_TEXT,
+    "tier": METRIC_TEXT,
+    "route": METRIC_TEXT,
+    "escalated_from": METRIC_TEXT,
+    "escalation": METRIC_TEXT,
+}
+
+
+class WorkspaceFull(Exception):
+    """The session already holds its maximum number of articles"""
+
+
+class SharedTexts:
+    """Process-wide LRU of compressed article texts capped at ``max_bytes``, spilling to an ArticleStore"""
+
+    def __init__(self, store, max_bytes=64 * 1024 * 1024):
+        self.store = store
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._sessions = weakref.WeakValueDictionary()
+        self.stats = {"hits": 0, "disk_reads": 0, "missing": 0, "stores": 0, "spills": 0}
+
+    def put(self, text):
+        """Keep text (once, however many sessions add it); returns its content hash"""
+        digest = content_hash(text)
+        with self._lock:
+            if digest in self._entries:
+                self._entries.move_to_end(digest)
+                return digest
+        data = zstd_compressor(3).compress(text.encode("utf-8"))
+        with self._lock:
+            if digest not in self._entries:
+                self.stats["stores"] += 1
+                self._remember(digest, data)
+            spilled = self._evict()
+        for old_digest, old_data in spilled:
+            self.store.spill(old_digest, old_data)
+        return digest
+
+    def get(self, digest):
+        """The text with this content hash, from memory or disk, or None if it is gone"""
+        with self._lock:
+            data = self._entries.get(digest)
+            if data is not None:
+                self.stats["hits"] += 1
+                self._entries.move_to_end(digest)
+        if data is not None:
+            return zstd_decompressor().decompress(data).decode("utf-8")
+        text = self.store.get_text(digest)
+        with self._lock:
+            self.stats["disk_reads" if text is not None else "missing"] += 1
+        if text is not None:
+            self.put(text)
+        return text
+
+    def __contains__(self, digest):
+        with self._lock:
+            if digest in self._entries:
+                return True
+        return self.store.has_text(digest)
+
+    def _remember(self, digest, data):
+        self._entries[digest] = data
+        self._bytes += len(data)
+
+    def _evict(self):
+        spilled = []
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            digest, data = self._entries.popitem(last=False)
+            self._bytes -= len(data)
+            self.stats["spills"] += 1
+            spilled.append((digest, data))
+        return spilled
+
+    def track(self, session):
+        with self._lock:
+            self._sessions[id(session)] = session
+
+    def report(self):
+        """Export memory gauges, charging each session an equal share of every text it references"""
+        with self._lock:
+            sessions = list(self._sessions.values())
+            sizes = {digest: len(data) for digest, data in self._entries.items()}
+            metrics.set_gauge("newsbot_workspace_text_bytes", self._bytes)
+            metrics.set_gauge("newsbot_workspace_texts", len(self._entries))
+        holders = {}
+        for session in sessions:
+            for digest in set(session.hashes().values()):
+                holders[digest] = holders.get(digest, 0) + 1
+        per_session = [
+            session.reference_bytes()
+            + sum(sizes.get(digest, 0) / holders[digest] for digest in set(session.hashes().values()))
+            for session in sessions
+        ]
+        metrics.set_gauge("newsbot_workspace_sessions", len(sessions))
+        metrics.set_gauge(
+            "newsbot_workspace_session_bytes", sum(per_session) / len(per_session) if per_session else 0, stat="mean"
+        )
+        metrics.set_gauge("newsbot_workspace_session_bytes", max(per_session, default=0), stat="max")
+
+
+class SessionArticles(MutableMapping):
+    """A session's loaded articles: {url: text} on the outside, {url: content hash} inside"""
+
+    def __init__(self, texts, max_articles=None, articles=None):
+        self._texts = texts
+        self.max_articles = max_articles
+        self._hashes = {}
+        texts.track(self)
+        for url, text in (articles or {}).items():
+            self[url] = text
+
+    def __getitem__(self, url):
+        text = self._texts.get(self._hashes[url])
+        if text is None:
+            raise KeyError(url)
+        return text
+
+    def __setitem__(self, url, text):
+        if url not in self._hashes and self.is_full():
+            raise WorkspaceFull(f"at most {self.max_articles} articles can be loaded at once")
+        self._hashes[url] = self._texts.put(text)
+        self._texts.report()
+
+    def __delitem__(self, url):
+        del self._hashes[url]
+        self._texts.report()
+
+    def __iter__(self):
+        return iter(list(self._hashes))
+
+    def __len__(self):
+        return len(self._hashes)
+
+    def clear(self):
+        self._hashes.clear()
+        self._texts.report()
+
+    def link(self, url, digest):
+        """Load url by content hash if that text is already held; returns whether it was"""
+        if digest not in self._texts:
+            return False
+        if url not in self._hashes and self.is_full():
+            raise WorkspaceFull(f"at most {self.max_articles} articles can be loaded at once")
+        self._hashes[url] = digest
+        self._texts.report()
+        return True
+
+    def is_full(self):
+        return self.max_articles is not None and len(self._hashes) >= self.max_articles
+
+    def remaining(self):
+        """How many more articles fit, or None without a limit"""
+        return None if self.max_articles is None else max(self.max_articles - len(self._hashes), 0)
+
+    def hashes(self):
+        """{url: content hash} of the loaded articles"""
+        return dict(self._hashes)
+
+    def reference_bytes(self):
+        """Memory held by the references themselves"""
+        return sys.getsizeof(self._hashes) + sum(
+            sys.getsizeof(url) + sys.getsizeof(digest) for url, digest in self._hashes.items()
+        )
+
+    def drop_missing(self):
+        """Forget articles whose text was evicted everywhere; returns their URLs"""
+        missing = [url for url, digest in self._hashes.items() if digest not in self._texts]
+        for url in missing:
+            del self._hashes[url]
+        if missing:
+            self._texts.report()
+        return missing
+
+
+@functools.lru_cache(maxsize=None)
+def get_shared_texts():
+    """Create the shared article texts once per process"""
+    texts = SharedTexts(
+        get_article_store(), max_bytes=get_setting("workspace", "memory_bytes", 64 * 1024 * 1024)
+    )
+    metrics.register_stats("workspace", lambda: texts.stats)
+    return texts
+
+
+def export_snapshot(articles, messages, include_text=True, chat_summary=None):
+    """Pack a session's articles, chat history and chat summary into a compressed snapshot.
+
+    Without include_text the snapshot holds only URLs and hashes; restoring
+    it re-links texts the server still has and re-fetches the rest.
+    """
+    hashes = articles.hashes()
+    texts = {}
+    if include_text:
+        for url, digest in hashes.items():
+            if digest not in texts:
+                texts[digest] = articles[url]
+    payload = {
+        "version": SNAPSHOT_VERSION,
+        "created_at": time.time(),
+        "articles": [[url, digest] for url, digest in hashes.items()],
+        "texts": texts,
+        "messages": messages,
+    }
+    if chat_summary is not None:
+        payload["chat_summary"] = chat_summary
+    return SNAPSHOT_MAGIC + zstandard.ZstdCompressor(level=10).compress(ormsgpack.packb(payload))
+
+
+def load_snapshot(data, max_bytes=None):
+    """Unpack and check a snapshot made by export_snapshot; raises ValueError if it isn't one"""
+    if max_bytes is None:
+        max_bytes = get_setting("workspace", "snapshot_max_bytes", 64 * 1024 * 1024)
+    if not data.startswith(SNAPSHOT_MAGIC):
+        raise ValueError("not a NEWSBOT workspace snapshot")
+    try:
+        reader = zstandard.ZstdDecompressor().stream_reader(io.BytesIO(data[len(SNAPSHOT_MAGIC):]))
+        parts = []
+        size = 0
+        while size <= max_bytes:
+            part = reader.read(1024 * 1024)
+            if not part:
+                break
+            parts.append(part)
+            size += len(part)
+        body = b"".join(parts)
+    except zstandard.ZstdError as e:
+        raise ValueError(f"corrupt workspace snapshot: {e}") from e
+    if len(body) > max_bytes:
+        raise ValueError(f"snapshot unpacks to more than {max_bytes} bytes")
+    try:
+        snapshot = ormsgpack.unpackb(body)
+    except ormsgpack.MsgpackDecodeError as e:
+        raise ValueError(f"corrupt workspace snapshot: {e}") from e
+    if not isinstance(snapshot, dict) or snapshot.get("version") != SNAPSHOT_VERSION:
+        raise ValueError("unsupported workspace snapshot version")
+    articles = snapshot.get("articles")
+    texts = snapshot.get("texts")
+    messages = snapshot.get("messages")
+    chat_summary = snapshot.get("chat_summary", {})
+    if (
+        not isinstance(articles, list)
+        or not all(isinstance(a, list) and len(a) == 2 and all(isinstance(v, str) for v in a) for a in articles)
+        or not isinstance(texts, dict)
+        or not all(isinstance(k, str) and isinstance(v, str) for k, v in texts.items())
+        or not isinstance(messages, list)
+        or not all(
+            isinstance(m, dict)
+            and m.get("role") in ("user", "assistant")
+            and isinstance(m.get("content"), str)
+            and isinstance(m.get("metrics", {}), dict)
+            and all(
+                isinstance(value, SNAPSHOT_METRICS.get(key, object))
+                for key, value in m.get("metrics", {}).items()
+            )
+            for m in messages
+        )
+        or not isinstance(chat_summary, dict)
+        or not all(isinstance(chat_summary.get(k, ""), str) for k in ("summary", "digest"))
+        or not isinstance(chat_summary.get("folded", 0), int)
+    ):
+        raise ValueError("malformed workspace snapshot")
+    for message in messages:
+        if "metrics" in message:
+            message["metrics"] = {k: v for k, v in message["metrics"].items() if k in SNAPSHOT_METRICS}
+    return snapshot
+
+
+def restore_snapshot(articles, snapshot):
+    """Replace a session's articles with a loaded snapshot's.
+
+    Texts the server already holds are re-linked by hash; the rest come
+    from the snapshot, checked against their hash. Returns the URLs that
+    could be restored neither way (they need fetching again). Articles
+    past the session's limit are left out.
+    """
+    articles.clear()
+    missing = []
+    for url, digest in snapshot["articles"]:
+        if articles.is_full():
+            break
+        if articles.link(url, digest):
+            continue
+        text = snapshot["texts"].get(digest)
+        if text is not None and content_hash(text) == digest:
+            articles[url] = text
+        else:
+            missing.append(url)
+    return missing
+
+
+def new_session_articles(articles=None):
+    """An empty (or pre-filled) session workspace over the shared texts"""
+    return SessionArticles(
+        get_shared_texts(), max_articles=get_setting("workspace", "max_articles", 20), articles=articles
+    )
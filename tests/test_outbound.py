@@ -0,0 +1,66 @@
+import threading
+import time
+
+import pytest
+
+from newsbot.outbound import BATCH, INTERACTIVE, OutboundQueueTimeout, OutboundScheduler, TokenBucket
+
+
+class RateLimited(Exception):
+    def __init__(self, retry_after):
+        super().__init__("429")
+        self.response = type("Response", (), {"status_code": 429, "headers": {"retry-after": str(retry_after)}})()
+
+
+def test_queued_caller_times_out_without_spinning():
+    bucket = TokenBucket(1, 1 / 2.5)
+    bucket.take(1)
+    scheduler = OutboundScheduler("test", {"requests": bucket})
+    head = threading.Thread(target=scheduler.acquire, args=(INTERACTIVE,), daemon=True)
+    head.start()
+    while not scheduler._waiting:
+        time.sleep(0.01)
+
+    waiter = threading.get_ident()
+    wakeups = 0
+    wait = scheduler._cond.wait
+
+    def counting_wait(timeout=None):
+        nonlocal wakeups
+        if threading.get_ident() == waiter:
+            wakeups += 1
+        return wait(timeout)
+
+    scheduler._cond.wait = counting_wait
+    started = time.monotonic()
+    with pytest.raises(OutboundQueueTimeout):
+        scheduler.acquire(BATCH, timeout=1)
+    assert time.monotonic() - started < 1.5
+    assert wakeups < 10
+    head.join(5)
+
+
+def test_retry_after_past_timeout_fails_fast():
+    scheduler = OutboundScheduler("test", {"requests": TokenBucket(100, 100)})
+
+    def rate_limited():
+        raise RateLimited(6)
+
+    started = time.monotonic()
+    with pytest.raises(OutboundQueueTimeout):
+        scheduler.call(rate_limited, timeout=1)
+    assert time.monotonic() - started < 0.5
+
+
+def test_retry_after_is_capped():
+    scheduler = OutboundScheduler("test", {"requests": TokenBucket(100, 100)}, max_attempts=2, max_backoff=0.1)
+    calls = []
+
+    def rate_limited():
+        calls.append(time.monotonic())
+        raise RateLimited(3600)
+
+    with pytest.raises(RateLimited):
+        scheduler.call(rate_limited, priority=BATCH)
+    assert len(calls) == 2
+    assert calls[1] - calls[0] < 1